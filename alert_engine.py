@@ -0,0 +1,125 @@
+import logging
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from alerts.models import Alert
+from .models import UserAlertPrefs, AlertState, PendingAlert, SavedEntity
+from .dashboard_cache import invalidate_dashboards
+
+logger = logging.getLogger(__name__)
+
+# alert type: UserAlertPrefs flag that subscribes to it
+ALERT_PREF_FIELDS = {
+    'price': 'price_alerts',
+    'deal': 'deal_alerts',
+    'review': 'review_alerts',
+}
+
+# How many deal links / opinion URLs to remember per entity
+SEEN_ITEMS_LIMIT = 100
+
+def diff_snapshot(state, data):
+    """Compare a fresh scrape with the last snapshot, returning (alert_type, message) events"""
+    events = []
+    name = data.get("name", "")
+
+    threshold = getattr(settings, 'PRICE_ALERT_THRESHOLD', 5)
+    change = (data.get("financials") or {}).get("price_change_percentage")
+    if change is not None:
+        old_change = state.price_change_percentage
+        # Only alert when the move first crosses the threshold
+        if abs(change) >= threshold and (old_change is None or abs(old_change) < threshold):
+            direction = "up" if change > 0 else "down"
+            events.append(('price', f"{name} is {direction} {abs(change):.2f}% today"))
+
+    seen_deals = set(state.deal_links)
+    for deal in data.get("deals", []):
+        if deal.get("link") and deal["link"] not in seen_deals:
+            events.append(('deal', f"New in the news for {name}: {deal.get('title', '')}"))
+
+    seen_opinions = set(state.opinion_urls)
+    for opinion in data.get("opinions", []):
+        if opinion.get("url") and opinion["url"] not in seen_opinions:
+            events.append(('review', f"New discussion about {name}: {opinion.get('text', '')}"))
+
+    return events
+
+def _update_state(state, data):
+    """Move an entity's snapshot forward to the latest scrape"""
+    change = (data.get("financials") or {}).get("price_change_percentage")
+    if change is not None:
+        state.price_change_percentage = change
+    new_deals = [d["link"] for d in data.get("deals", []) if d.get("link")]
+    new_opinions = [o["url"] for o in data.get("opinions", []) if o.get("url")]
+    state.deal_links = list(dict.fromkeys(new_deals + state.deal_links))[:SEEN_ITEMS_LIMIT]
+    state.opinion_urls = list(dict.fromkeys(new_opinions + state.opinion_urls))[:SEEN_ITEMS_LIMIT]
+    state.save()
+
+def get_subscribers(entity_id):
+    """Return {user_id: prefs} for every user who saved the entity
+
+    Users without a UserAlertPrefs row get the model defaults.
+    """
+    user_ids = set(SavedEntity.objects.filter(entity_id=entity_id).values_list('user_id', flat=True))
+    prefs = {p.user_id: p for p in UserAlertPrefs.objects.filter(user_id__in=user_ids)}
+    return {user_id: prefs.get(user_id) or UserAlertPrefs(user_id=user_id) for user_id in user_ids}
+
+def evaluate_snapshot(entity_id, data):
+    """Turn the changes in a fresh scrape into alerts for the entity's subscribers
+
+    The scrape is diffed once against the stored snapshot, whatever the
+    number of subscribers. Immediate alerts are bulk inserted as Alert
+    rows; daily and weekly subscribers get PendingAlert rows instead, which
+    send_digests rolls up. Returns the number of rows created.
+    """
+    with transaction.atomic():
+        state, created = AlertState.objects.select_for_update().get_or_create(entity_id=entity_id)
+        # The first snapshot is only a baseline
+        events = [] if created else diff_snapshot(state, data)
+        _update_state(state, data)
+
+    if not events:
+        return 0
+
+    alerts = []
+    pending = []
+    for user_id, prefs in get_subscribers(entity_id).items():
+        for alert_type, message in events:
+            if not getattr(prefs, ALERT_PREF_FIELDS[alert_type]):
+                continue
+            if prefs.alert_frequency == 'immediate':
+                alerts.append(Alert(user_id=user_id, entity_id=entity_id, alert_type=alert_type, message=message))
+            else:
+                pending.append(PendingAlert(
+                    user_id=user_id, entity_id=entity_id, alert_type=alert_type,
+                    message=message, frequency=prefs.alert_frequency,
+                ))
+
+    Alert.objects.bulk_create(alerts, batch_size=1000)
+    PendingAlert.objects.bulk_create(pending, batch_size=1000)
+    invalidate_dashboards({alert.user_id for alert in alerts})
+    return len(alerts) + len(pending)
+
+def send_digests(frequency):
+    """Roll pending alerts for a digest frequency into one Alert per user, entity and type"""
+    with transaction.atomic():
+        pending = list(
+            PendingAlert.objects.select_for_update()
+            .filter(frequency=frequency)
+            .order_by('created_at')
+        )
+        if not pending:
+            return 0
+
+        grouped = defaultdict(list)
+        for item in pending:
+            grouped[(item.user_id, item.entity_id, item.alert_type)].append(item.message)
+
+        alerts = [
+            Alert(user_id=user_id, entity_id=entity_id, alert_type=alert_type, message="\n".join(messages))
+            for (user_id, entity_id, alert_type), messages in grouped.items()
+        ]
+        Alert.objects.bulk_create(alerts, batch_size=1000)
+        PendingAlert.objects.filter(id__in=[item.id for item in pending]).delete()
+    invalidate_dashboards({alert.user_id for alert in alerts})
+    return len(alerts)
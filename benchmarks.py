@@ -0,0 +1,375 @@
+"""Offline benchmarks for the scraping pipeline
+
+Run from the project environment, e.g.::
+
+    DJANGO_SETTINGS_MODULE=<project>.settings python -m core.benchmarks yahoo
+    DJANGO_SETTINGS_MODULE=<project>.settings python -m core.benchmarks replay
+    DJANGO_SETTINGS_MODULE=<project>.settings python -m core.benchmarks replay \
+        --scenario herd --latency 0.2 --failure-rate 0.1 --concurrency 32
+
+See ``python -m core.benchmarks --help`` for every option.
+"""
+import os
+import sys
+import argparse
+import glob
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bs4 import BeautifulSoup
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def _setup_django():
+    """Initialise Django when run as a script"""
+    import django
+    from django.conf import settings
+    if not settings.configured and 'DJANGO_SETTINGS_MODULE' not in os.environ:
+        sys.exit("Set DJANGO_SETTINGS_MODULE to run the benchmarks")
+    django.setup()
+
+def _parse_yahoo_with_soup(html, metric_fields):
+    """The previous Yahoo extraction: a full tree plus one scan per field"""
+    soup = BeautifulSoup(html, 'html.parser')
+    price = None
+    for selector in ['fin-streamer[data-field="regularMarketPrice"]', '[data-test="qsp-price"]', r'.Fw\(b\).Fz\(36px\)']:
+        element = soup.select_one(selector)
+        if element:
+            price = element.get('value') or element.text.strip()
+            if price:
+                break
+    metrics = {"current_price": price}
+    for test_id, metric_name in metric_fields.items():
+        element = soup.find(attrs={"data-test": test_id})
+        if element:
+            metrics[metric_name] = element.text.strip()
+    return metrics
+
+def _parse_yahoo_streaming(html):
+    """The single-pass Yahoo extraction used by the scrapers"""
+    from .html_extract import extract_elements
+    from .scrapers import YAHOO_QUOTE_SPECS, YAHOO_PRICE_KEYS, YAHOO_METRIC_FIELDS
+    found = extract_elements(html, YAHOO_QUOTE_SPECS)
+    price = None
+    for key in YAHOO_PRICE_KEYS:
+        element = found.get(key)
+        if element:
+            price = element['attrs'].get('value') or element['text']
+            if price:
+                break
+    metrics = {"current_price": price}
+    for test_id, metric_name in YAHOO_METRIC_FIELDS.items():
+        if test_id in found:
+            metrics[metric_name] = found[test_id]['text']
+    return metrics
+
+def _time_per_call(func, arg, rounds):
+    """Average seconds per call over a number of rounds"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(arg)
+    return (time.perf_counter() - start) / rounds
+
+def bench_yahoo_parsing(paths=None, rounds=20):
+    """Compare the soup-based and single-pass Yahoo parsers on saved quote pages
+
+    Drop real pages saved from finance.yahoo.com/quote/<SYMBOL> into
+    fixtures/yahoo/ to benchmark against current markup.
+    """
+    from .scrapers import YAHOO_METRIC_FIELDS
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES_DIR, 'yahoo', '*.html')))
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+
+        soup_result = _parse_yahoo_with_soup(html, YAHOO_METRIC_FIELDS)
+        streaming_result = _parse_yahoo_streaming(html)
+        if soup_result != streaming_result:
+            print(f"{os.path.basename(path)}: results differ\n  soup: {soup_result}\n  streaming: {streaming_result}")
+
+        soup_time = _time_per_call(lambda h: _parse_yahoo_with_soup(h, YAHOO_METRIC_FIELDS), html, rounds)
+        streaming_time = _time_per_call(_parse_yahoo_streaming, html, rounds)
+        print(
+            f"{os.path.basename(path)} ({len(html) // 1024}KB): "
+            f"soup {soup_time * 1000:.2f}ms, streaming {streaming_time * 1000:.2f}ms, "
+            f"{soup_time / streaming_time:.1f}x faster"
+        )
+
+# Provider hosts the replay server stands in for, and the name it serves them under
+REPLAY_HOSTS = {
+    'financialmodelingprep.com': 'fmp',
+    'finnhub.io': 'finnhub',
+    'finance.yahoo.com': 'yahoo',
+    'news.google.com': 'news',
+    'www.reddit.com': 'reddit',
+}
+
+# (provider, path prefix): (fixture, content type)
+REPLAY_FIXTURES = {
+    ('fmp', '/api/v3/quote/'): ('fmp/quote.json', 'application/json'),
+    ('fmp', '/api/v3/profile/'): ('fmp/profile.json', 'application/json'),
+    ('fmp', '/api/v3/ratios-ttm/'): ('fmp/ratios-ttm.json', 'application/json'),
+    ('fmp', '/api/v3/search'): ('fmp/search.json', 'application/json'),
+    ('finnhub', '/api/v1/quote'): ('finnhub/quote.json', 'application/json'),
+    ('finnhub', '/api/v1/stock/profile2'): ('finnhub/profile2.json', 'application/json'),
+    ('finnhub', '/api/v1/stock/metric'): ('finnhub/metric.json', 'application/json'),
+    ('yahoo', '/quote/'): ('yahoo/quote_AAPL.html', 'text/html; charset=utf-8'),
+    ('news', '/rss/search'): ('news/search.xml', 'application/rss+xml; charset=utf-8'),
+    ('reddit', '/search.json'): ('reddit/search.json', 'application/json'),
+}
+
+# FMP endpoints that take comma-separated symbols and return one record per symbol
+REPLAY_FMP_PER_SYMBOL = ('/api/v3/quote/', '/api/v3/profile/')
+
+REPLAY_SYMBOLS = [
+    'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'TSLA', 'NFLX',
+    'ADBE', 'ORCL', 'INTC', 'AMD', 'IBM', 'CSCO', 'CRM', 'PYPL',
+]
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Hand each request to the ReplayUpstream that owns the server"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.upstream.respond(self)
+
+    def log_message(self, format, *args):
+        pass
+
+class ReplayUpstream:
+    """Local HTTP stand-in for the providers, serving recorded fixtures
+
+    Every response is delayed by ``latency`` seconds (jittered by +/-50%)
+    and fails with a 503 at ``failure_rate``. ``faults`` overrides both per
+    provider as ``{provider: (latency, failure_rate)}``. Responses carry an
+    ETag and honour If-None-Match like the real feeds. Calls per provider
+    are counted in ``calls``.
+    """
+
+    def __init__(self, latency=0.05, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.faults = {}
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _ReplayHandler)
+        self._server.daemon_threads = True
+        self._server.upstream = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def overrides(self):
+        """SCRAPER_UPSTREAM_OVERRIDES pointing every provider host at this server"""
+        port = self._server.server_address[1]
+        return {host: f"http://127.0.0.1:{port}/{provider}" for host, provider in REPLAY_HOSTS.items()}
+
+    def reset(self):
+        """Clear the call counts and per-provider faults"""
+        with self._lock:
+            self.calls.clear()
+            self.faults = {}
+
+    def _load(self, fixture):
+        """Read a fixture once and keep it in memory"""
+        body = self._bodies.get(fixture)
+        if body is None:
+            with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+                body = self._bodies[fixture] = f.read()
+        return body
+
+    def _get_body(self, provider, path):
+        """Return the recorded (body, content type) for a request path, or None"""
+        path, _, _ = path.partition('?')
+        for (fixture_provider, prefix), (fixture, content_type) in REPLAY_FIXTURES.items():
+            if provider != fixture_provider or not path.startswith(prefix):
+                continue
+            body = self._load(fixture)
+            if provider == 'fmp' and prefix in REPLAY_FMP_PER_SYMBOL:
+                # Re-key the recorded record for each requested symbol
+                record = json.loads(body)[0]
+                symbols = path[len(prefix):].split(',')
+                body = json.dumps([dict(record, symbol=symbol) for symbol in symbols]).encode()
+            return body, content_type
+        return None
+
+    def respond(self, handler):
+        provider, _, path = handler.path.lstrip('/').partition('/')
+        with self._lock:
+            self.calls[provider] += 1
+            latency, failure_rate = self.faults.get(provider, (self.latency, self.failure_rate))
+            delay = latency * self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < failure_rate
+        time.sleep(delay)
+
+        found = None if failed else self._get_body(provider, '/' + path)
+        if failed:
+            status, body, content_type = 503, b'Service Unavailable', 'text/plain'
+        elif found is None:
+            status, body, content_type = 404, b'Not Found', 'text/plain'
+        else:
+            status, (body, content_type) = 200, found
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if status == 200 and handler.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        if status in (200, 304):
+            handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def _reset_scraper_state():
+    """Empty the cache and the scraped tables so a scenario starts cold"""
+    from django.core.cache import cache
+    from .scraper_models import CompanySymbol, FeedItem, FeedState, FinancialSnapshot
+    cache.clear()
+    for model in (FeedItem, FeedState, FinancialSnapshot, CompanySymbol):
+        model.objects.all().delete()
+
+def _run_entity_requests(entity_names, concurrency):
+    """Scrape each entity from a pool of concurrent clients
+
+    Returns the total wall time, the per-request latencies and the number
+    of requests with a source that failed or timed out.
+    """
+    from django.db import connections
+    from .scrapers import scrape_entity_info
+
+    def scrape(entity_name):
+        start = time.perf_counter()
+        try:
+            data = scrape_entity_info(entity_name, 'company')
+        finally:
+            connections.close_all()
+        complete = all(status in ('ok', 'empty') for status in data['source_status'].values())
+        return time.perf_counter() - start, complete
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(scrape, entity_names))
+    return time.perf_counter() - start, [r[0] for r in results], sum(1 for r in results if not r[1])
+
+def _scenario_cold(upstream, concurrency):
+    """Every entity requested once with nothing cached"""
+    return REPLAY_SYMBOLS, concurrency
+
+def _scenario_warm(upstream, concurrency):
+    """Every entity requested repeatedly after one priming pass"""
+    _run_entity_requests(REPLAY_SYMBOLS, concurrency)
+    upstream.reset()
+    return REPLAY_SYMBOLS * 4, concurrency
+
+def _scenario_herd(upstream, concurrency):
+    """Many clients requesting the same uncached entity at once"""
+    clients = concurrency * 4
+    return [REPLAY_SYMBOLS[0]] * clients, clients
+
+def _scenario_outage(upstream, concurrency):
+    """FMP failing every call, so the chain falls through to Finnhub"""
+    upstream.faults['fmp'] = (upstream.latency, 1.0)
+    return REPLAY_SYMBOLS, concurrency
+
+REPLAY_SCENARIOS = {
+    'cold': _scenario_cold,
+    'warm': _scenario_warm,
+    'herd': _scenario_herd,
+    'outage': _scenario_outage,
+}
+
+def bench_replay(scenarios=None, latency=0.05, failure_rate=0.0, concurrency=8, seed=0):
+    """Run scrape_entity_info scenarios against a local replay of the providers
+
+    Each scenario runs in a throwaway test database with a local-memory
+    cache and reports throughput, p50/p99 latency, incomplete results and
+    the upstream calls each provider received. ``latency`` and
+    ``failure_rate`` apply to every provider; scenarios add their own
+    faults on top.
+    """
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    upstream = ReplayUpstream(latency=latency, failure_rate=failure_rate, seed=seed)
+    upstream.start()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            SCRAPER_UPSTREAM_OVERRIDES=upstream.overrides(),
+            FINANCIAL_MODELING_PREP_API_KEY='replay',
+            FINNHUB_API_KEY='replay',
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replay'}},
+        ):
+            for name in scenarios or REPLAY_SCENARIOS:
+                _reset_scraper_state()
+                upstream.reset()
+                entity_names, clients = REPLAY_SCENARIOS[name](upstream, concurrency)
+                elapsed, latencies, incomplete = _run_entity_requests(entity_names, clients)
+                calls = ', '.join(f"{provider} {count}" for provider, count in sorted(upstream.calls.items()))
+                print(
+                    f"{name}: {len(latencies)} requests, {len(latencies) / elapsed:.1f} req/s, "
+                    f"p50 {_percentile(latencies, 50) * 1000:.1f}ms, p99 {_percentile(latencies, 99) * 1000:.1f}ms, "
+                    f"{incomplete} incomplete\n  upstream calls: {calls or 'none'}"
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        upstream.stop()
+
+BENCHMARKS = {
+    'yahoo': bench_yahoo_parsing,
+    'replay': bench_replay,
+}
+
+# Command line options passed on to each benchmark, by keyword argument
+BENCHMARK_OPTIONS = {
+    'yahoo': ('rounds',),
+    'replay': ('scenarios', 'latency', 'failure_rate', 'concurrency', 'seed'),
+}
+
+def _parse_args(argv):
+    """Read the benchmarks to run and their options; options left out keep the benchmark's defaults"""
+    parser = argparse.ArgumentParser(prog='python -m core.benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark', help=f"one of {', '.join(BENCHMARKS)} (default: all)")
+    yahoo = parser.add_argument_group('yahoo')
+    yahoo.add_argument('--rounds', type=int, default=argparse.SUPPRESS, help="parses per page and parser (default: 20)")
+    replay = parser.add_argument_group('replay')
+    replay.add_argument('--scenario', dest='scenarios', action='append', choices=REPLAY_SCENARIOS, default=argparse.SUPPRESS,
+                        help="scenario to run, repeatable (default: all)")
+    replay.add_argument('--latency', type=float, default=argparse.SUPPRESS, help="seconds each provider takes to answer (default: 0.05)")
+    replay.add_argument('--failure-rate', type=float, default=argparse.SUPPRESS, help="share of provider calls failing with a 503 (default: 0)")
+    replay.add_argument('--concurrency', type=int, default=argparse.SUPPRESS, help="concurrent clients (default: 8)")
+    replay.add_argument('--seed', type=int, default=argparse.SUPPRESS, help="random seed for the injected failures (default: 0)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    return args
+
+def main(argv=None):
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    _setup_django()
+    for name in args.benchmarks or BENCHMARKS:
+        options = {option: getattr(args, option) for option in BENCHMARK_OPTIONS[name] if hasattr(args, option)}
+        BENCHMARKS[name](**options)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.core.cache import cache
+from django.conf import settings
+
+_lock = threading.Lock()
+
+# Upstream calls made for the request being handled, shared with the pool
+# threads it fans out to
+_spent = ContextVar('budget_spent', default=None)
+
+# Set while handling a request from a client that has used up its budget
+_cache_only = ContextVar('budget_cache_only', default=False)
+
+def get_budget():
+    """(max upstream calls, per seconds) allowed for each user"""
+    return getattr(settings, 'SCRAPER_USER_BUDGET', (300, 3600))
+
+def get_budget_key(request):
+    """Identify who a request's upstream cost is charged to: the user, or the client address"""
+    if request.user.is_authenticated:
+        return f"user:{request.user.id}"
+    return f"addr:{request.META.get('REMOTE_ADDR', '')}"
+
+def _window_keys(budget_key, per_seconds):
+    """Cache keys of the current and previous fixed windows, and how far into the current one we are"""
+    now = time.time()
+    window = int(now // per_seconds)
+    elapsed = (now - window * per_seconds) / per_seconds
+    return f"budget:{budget_key}:{window}", f"budget:{budget_key}:{window - 1}", elapsed
+
+def get_usage(budget_key):
+    """Upstream calls charged over the last window
+
+    A sliding window approximated from two fixed-window counters: the
+    previous window's count is weighted by how much of it still overlaps
+    the sliding window. Only the counters live in the cache, so usage is
+    shared by every worker.
+    """
+    _, per_seconds = get_budget()
+    current, previous, elapsed = _window_keys(budget_key, per_seconds)
+    counts = cache.get_many([current, previous])
+    return counts.get(current, 0) + counts.get(previous, 0) * (1 - elapsed)
+
+def charge(budget_key, cost):
+    """Add upstream calls to a budget's current window"""
+    if cost <= 0:
+        return
+    _, per_seconds = get_budget()
+    current, _, _ = _window_keys(budget_key, per_seconds)
+    # Counters must outlive the next window, which still weighs this one
+    cache.add(current, 0, per_seconds * 2)
+    try:
+        cache.incr(current, cost)
+    except ValueError:
+        # The counter expired between add and incr
+        cache.set(current, cost, per_seconds * 2)
+
+def is_over_budget(budget_key):
+    """Check whether a budget has no upstream calls left in the current window"""
+    max_calls, _ = get_budget()
+    return get_usage(budget_key) >= max_calls
+
+def cache_only():
+    """Whether the current request must be served without calling any provider"""
+    return _cache_only.get()
+
+def record_upstream_call():
+    """Count an upstream call against the current request's budget, if one is being tracked"""
+    spent = _spent.get()
+    if spent is not None:
+        with _lock:
+            spent['calls'] += 1
+
+@contextmanager
+def charge_upstream(budget_key):
+    """Charge the upstream calls made inside the block to a budget
+
+    Inside the block cache_only() is true when the budget was already
+    spent, so the scrapers serve cached and stored data instead of
+    scraping live.
+    """
+    spent = {'calls': 0}
+    spent_token = _spent.set(spent)
+    cache_only_token = _cache_only.set(is_over_budget(budget_key))
+    try:
+        yield
+    finally:
+        _cache_only.reset(cache_only_token)
+        _spent.reset(spent_token)
+        charge(budget_key, spent['calls'])
+
+class UpstreamBudgetMiddleware:
+    """Charge each request's upstream calls to its user's budget
+
+    Over-budget users get cache-only responses until their usage over the
+    last SCRAPER_USER_BUDGET window drops. Streaming responses run after
+    the middleware returns, so streaming views charge their own budget.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with charge_upstream(get_budget_key(request)):
+            return self.get_response(request)
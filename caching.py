@@ -0,0 +1,223 @@
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from django.core.cache import cache
+from django.conf import settings
+from django.db import connections
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# kind: (soft TTL, hard TTL) in seconds. Past the soft TTL an entry is still
+# served but refreshed in the background; past the hard TTL it is gone.
+DEFAULT_CACHE_TTLS = {
+    'quote': (600, 3600),
+    'profile': (86400, 7 * 86400),
+    'ratios': (21600, 86400),
+    'entity': (600, 3600),
+    'search': (300, 1800),
+    'negative': (120, 120),
+}
+
+_refresh_executor = None
+_inflight = {}
+_lock = threading.Lock()
+
+def get_ttls(kind):
+    """Return the (soft, hard) TTLs for a data kind, honouring SCRAPER_CACHE_TTLS"""
+    ttls = getattr(settings, 'SCRAPER_CACHE_TTLS', {})
+    return ttls.get(kind, DEFAULT_CACHE_TTLS[kind])
+
+def _is_entry(entry):
+    """Check that a cached object was written by set_cached
+
+    Values cached before entries carried a soft expiry are bare, and are
+    treated as misses until they are overwritten.
+    """
+    return isinstance(entry, dict) and 'value' in entry and 'soft_expires' in entry
+
+def unwrap(entry):
+    """Return the value stored in a cache entry, ignoring its freshness"""
+    if not _is_entry(entry):
+        return None
+    return entry['value']
+
+def is_stale(entry):
+    """Check whether a cache entry is past its soft TTL and due for a refresh"""
+    return _is_entry(entry) and time.time() >= entry['soft_expires']
+
+def get_cached(key):
+    """Return the cached value for a key, fresh or stale, or None"""
+    return unwrap(cache.get(key))
+
+def set_cached(key, value, kind):
+    """Store a value with the soft and hard TTLs of its data kind"""
+    soft_ttl, hard_ttl = get_ttls(kind)
+    cache.set(key, {'value': value, 'soft_expires': time.time() + soft_ttl}, hard_ttl)
+
+def _get_refresh_executor():
+    """Return the pool used for background refreshes"""
+    global _refresh_executor
+    if _refresh_executor is None:
+        with _lock:
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SCRAPER_REFRESH_WORKERS', 2),
+                    thread_name_prefix='scraper-refresh',
+                )
+    return _refresh_executor
+
+def _refresh_in_background(key, fetch, kind, is_valid):
+    """Refetch a stale entry, keeping the stale value if the refetch fails"""
+    try:
+        value = fetch()
+        if is_valid(value):
+            set_cached(key, value, kind)
+    except Exception as e:
+        logger.error(f"Background refresh of {key} failed: {str(e)}")
+    finally:
+        cache.delete(f"{key}:refreshing")
+        connections.close_all()
+
+def revalidate(key, fetch, kind, is_valid=bool):
+    """Schedule a background refresh of a stale entry, once across all workers"""
+    # cache.add only succeeds for one caller, so only one refresh runs
+    if cache.add(f"{key}:refreshing", 1, get_ttls('negative')[1]):
+        _get_refresh_executor().submit(_refresh_in_background, key, fetch, kind, is_valid)
+
+def cached_fetch(key, fetch, kind, is_valid=bool, timeout=None):
+    """Stale-while-revalidate lookup
+
+    Fresh entries are returned as is. Stale entries are returned immediately
+    and one background refresh is scheduled across all workers. On a miss the
+    value is fetched synchronously; results failing ``is_valid`` are cached
+    with the short 'negative' TTL so dead keys don't hit upstream every time.
+    """
+    entry = cache.get(key)
+    if _is_entry(entry):
+        if is_stale(entry):
+            metrics.inc('scraper_cache_lookups_total', kind=kind, result='stale')
+            revalidate(key, fetch, kind, is_valid)
+        else:
+            metrics.inc('scraper_cache_lookups_total', kind=kind, result='fresh')
+        return entry['value']
+    
+    metrics.inc('scraper_cache_lookups_total', kind=kind, result='miss')
+
+    def load():
+        value = fetch()
+        set_cached(key, value, kind if is_valid(value) else 'negative')
+        return value
+    
+    return single_flight(key, load, timeout=timeout)
+
+def _single_flight_across_workers(key, fetch, timeout):
+    """Let one worker process run fetch while the others wait for its result"""
+    lock_key = f"{key}:inflight"
+    result_key = f"{key}:flight_result"
+    
+    if cache.add(lock_key, 1, timeout):
+        try:
+            value = fetch()
+            cache.set(result_key, {'value': value}, getattr(settings, 'SCRAPER_SINGLE_FLIGHT_RESULT_TTL', 5))
+            return value
+        finally:
+            cache.delete(lock_key)
+    
+    # Another worker is fetching; poll for its result until it finishes
+    poll_interval = getattr(settings, 'SCRAPER_SINGLE_FLIGHT_POLL', 0.1)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(poll_interval)
+        entry = cache.get(result_key)
+        if entry is not None:
+            return entry['value']
+        if cache.get(lock_key) is None:
+            break
+    
+    # The other worker died, failed or is too slow; fetch ourselves
+    return fetch()
+
+def single_flight(key, fetch, timeout=None):
+    """Coalesce concurrent calls for the same key into one fetch
+
+    Within a process, callers for a key already in flight wait on the
+    leader's future. Across processes, the leader holds a lock in the Django
+    cache and publishes its result briefly for the workers polling on it.
+    Callers give up waiting after ``timeout`` seconds
+    (``SCRAPER_SINGLE_FLIGHT_TIMEOUT``), or when the leader abandons the
+    key, and fetch on their own.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'SCRAPER_SINGLE_FLIGHT_TIMEOUT', 15)
+    
+    with _lock:
+        future = _inflight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[key] = future
+    
+    if not is_leader:
+        try:
+            return future.result(timeout=timeout)
+        except (FuturesTimeoutError, CancelledError):
+            return fetch()
+    
+    try:
+        value = _single_flight_across_workers(key, fetch, timeout)
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+@contextmanager
+def claim_flight(key, timeout=None):
+    """Lead the single flight for a key while producing its value outside single_flight
+
+    For callers that build the value step by step, e.g. while streaming it.
+    Yields a function publishing the value to the callers of single_flight
+    waiting on the key, or None when the key is already in flight in this
+    or another worker, in which case the caller should join that flight
+    with single_flight instead. Waiters fetch on their own if the block
+    exits without publishing.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'SCRAPER_SINGLE_FLIGHT_TIMEOUT', 15)
+    lock_key = f"{key}:inflight"
+    
+    with _lock:
+        if key in _inflight:
+            future = None
+        else:
+            future = Future()
+            _inflight[key] = future
+    
+    claimed = future is not None and cache.add(lock_key, 1, timeout)
+    if not claimed:
+        if future is not None:
+            with _lock:
+                _inflight.pop(key, None)
+            future.cancel()
+        yield None
+        return
+    
+    def publish(value):
+        cache.set(f"{key}:flight_result", {'value': value}, getattr(settings, 'SCRAPER_SINGLE_FLIGHT_RESULT_TTL', 5))
+        future.set_result(value)
+    
+    try:
+        yield publish
+    finally:
+        cache.delete(lock_key)
+        with _lock:
+            _inflight.pop(key, None)
+        # Only takes effect if nothing was published
+        future.cancel()
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_companysymbol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinancialSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('captured_at', models.DateTimeField()),
+                ('resolution', models.CharField(choices=[('raw', 'Raw'), ('hour', 'Hourly'), ('day', 'Daily')], default='raw', max_length=4)),
+                ('price', models.FloatField(null=True)),
+                ('price_change_percentage', models.FloatField(null=True)),
+                ('day_high', models.FloatField(null=True)),
+                ('day_low', models.FloatField(null=True)),
+                ('volume', models.BigIntegerField(null=True)),
+                ('market_cap', models.FloatField(null=True)),
+                ('pe_ratio', models.FloatField(null=True)),
+                ('eps', models.FloatField(null=True)),
+                ('dividend_yield', models.FloatField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['symbol', 'resolution', 'captured_at'], name='core_financ_symbol_383536_idx')],
+            },
+        ),
+    ]
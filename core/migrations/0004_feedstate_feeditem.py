@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_financialsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_key', models.CharField(max_length=255)),
+                ('kind', models.CharField(max_length=10)),
+                ('item_hash', models.CharField(max_length=40)),
+                ('payload', models.JSONField()),
+                ('published_at', models.DateTimeField(null=True)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['feed_key', 'kind', '-published_at'], name='core_feedit_feed_ke_877349_idx')],
+                'unique_together': {('feed_key', 'kind', 'item_hash')},
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_key', models.CharField(max_length=255)),
+                ('kind', models.CharField(max_length=10)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('fetched_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'unique_together': {('feed_key', 'kind')},
+            },
+        ),
+    ]
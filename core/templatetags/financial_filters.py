@@ -0,0 +1,19 @@
+from django import template
+from core.financials import NUMBER_SUFFIXES, parse_number
+
+register = template.Library()
+
+@register.filter
+def abbreviate(value, digits=2):
+    """Show a large figure with a magnitude suffix, e.g. 2534000000000 -> "2.53T"
+
+    Values that aren't numeric are shown unchanged.
+    """
+    number = parse_number(value)
+    if number is None:
+        return value
+    digits = int(digits)
+    for suffix, scale in sorted(NUMBER_SUFFIXES.items(), key=lambda item: item[1], reverse=True):
+        if abs(number) >= scale:
+            return f"{number / scale:.{digits}f}{suffix}"
+    return f"{number:.{digits}f}"
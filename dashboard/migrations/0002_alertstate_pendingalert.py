@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('dashboard', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_change_percentage', models.FloatField(blank=True, null=True)),
+                ('deal_links', models.JSONField(default=list)),
+                ('opinion_urls', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('entity', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='core.entitydata')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PendingAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alert_type', models.CharField(max_length=20)),
+                ('message', models.TextField()),
+                ('frequency', models.CharField(db_index=True, max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('entity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.entitydata')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:22
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def saved_entities_from_history(apps, schema_editor):
+    """Copy the old "Saved entity" SearchHistory rows into SavedEntity, once per user and entity"""
+    SearchHistory = apps.get_model('core', 'SearchHistory')
+    SavedEntity = apps.get_model('dashboard', 'SavedEntity')
+
+    saved = (
+        SearchHistory.objects.filter(notes="Saved entity")
+        .values_list('user_id', 'entity_id').distinct().iterator()
+    )
+    rows = []
+    for user_id, entity_id in saved:
+        rows.append(SavedEntity(user_id=user_id, entity_id=entity_id))
+        if len(rows) >= BATCH_SIZE:
+            SavedEntity.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    SavedEntity.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('dashboard', '0003_savedentity'),
+    ]
+
+    operations = [
+        migrations.RunPython(saved_entities_from_history, migrations.RunPython.noop),
+    ]
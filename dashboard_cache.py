@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.cache import cache
+
+def get_dashboard_key(user_id):
+    """Cache key for a user's assembled dashboard context"""
+    return f"dashboard_{user_id}"
+
+def invalidate_dashboards(user_ids):
+    """Drop the cached dashboards of the given users"""
+    cache.delete_many([get_dashboard_key(user_id) for user_id in user_ids])
+
+def get_dashboard_ttl():
+    """How long an assembled dashboard may be served from the cache"""
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 60)
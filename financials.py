@@ -0,0 +1,136 @@
+import re
+from collections.abc import Mapping
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Bump when FIELDS changes so records packed with the old layout are dropped
+RECORD_VERSION = 1
+
+NUMERIC_FIELDS = (
+    'current_price', 'price_change', 'price_change_percentage', 'open', 'previous_close',
+    'day_high', 'day_low', 'year_high', 'year_low', 'bid', 'ask', 'target_price',
+    'volume', 'avg_volume', 'market_cap', 'beta', 'eps', 'pe_ratio', 'pe_ratio_ttm', 'peg_ratio',
+    'dividend_yield', 'payout_ratio', 'current_ratio', 'quick_ratio',
+    'gross_profit_margin', 'operating_profit_margin', 'net_profit_margin',
+    'return_on_assets', 'return_on_equity',
+)
+INTEGER_FIELDS = {'volume', 'avg_volume'}
+TEXT_FIELDS = (
+    'company_name', 'currency', 'exchange', 'industry', 'sector', 'description', 'ceo',
+    'website', 'image', 'earnings_date', 'ex_dividend_date', 'source', 'last_updated',
+)
+FIELDS = NUMERIC_FIELDS + TEXT_FIELDS
+
+# Magnitude suffixes used in scraped figures such as "2.5T" or "310.4M"
+NUMBER_SUFFIXES = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+
+_NUMBER_RE = re.compile(r'^([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)([KMBT])?%?$', re.IGNORECASE)
+
+def parse_number(value):
+    """Parse a provider value into a float, or None when it isn't numeric
+
+    Accepts numbers and strings with thousands separators, currency signs,
+    a trailing percent sign (the value is kept in percent) or a magnitude
+    suffix ("2.5T" -> 2.5e12). Placeholders like "N/A" or "--" give None.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().replace(',', '').replace('$', '')
+    negative = text.startswith('(') and text.endswith(')')
+    match = _NUMBER_RE.match(text.strip('()'))
+    if not match:
+        return None
+    number = float(match.group(1)) * NUMBER_SUFFIXES.get((match.group(2) or '').upper(), 1)
+    return -number if negative else number
+
+def parse_range(value):
+    """Parse a range such as "164.08 - 199.62" into (low, high); either may be None"""
+    if not value:
+        return None, None
+    low, _, high = str(value).partition(' - ')
+    return parse_number(low), parse_number(high)
+
+def _unpack(packed):
+    """Rebuild a record from FinancialRecord.pack() output, used when unpickling"""
+    return FinancialRecord.unpack(packed)
+
+class FinancialRecord(Mapping):
+    """Normalized financial data for one symbol, whichever provider it came from
+
+    Numeric fields are parsed at construction, so templates and comparisons
+    always see numbers. Percentages are in percent. The record reads like a
+    dict of its set fields, which keeps ``.get()``, template lookups and
+    ``items|length`` working. Pickling (and so the Django cache) stores
+    only the packed field values, without the keys.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for field in FIELDS:
+            setattr(self, field, None)
+        self.update(values)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a provider dict, ignoring keys that aren't fields"""
+        return cls(**{key: value for key, value in data.items() if key in FIELDS})
+
+    def update(self, values):
+        """Set fields from a dict, parsing numeric ones; None values leave a field unchanged"""
+        for field, value in values.items():
+            if value is None:
+                continue
+            if field in INTEGER_FIELDS:
+                value = parse_number(value)
+                value = int(value) if value is not None else None
+            elif field in NUMERIC_FIELDS:
+                value = parse_number(value)
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return (field for field in FIELDS if getattr(self, field) is not None)
+
+    def __len__(self):
+        return sum(1 for field in FIELDS if getattr(self, field) is not None)
+
+    def __repr__(self):
+        return f"FinancialRecord({dict(self)!r})"
+
+    def as_dict(self):
+        """Return the set fields as a plain dict, e.g. for JSON"""
+        return dict(self)
+
+    def pack(self):
+        """Serialize the field values positionally, as msgpack bytes when available"""
+        values = [getattr(self, field) for field in FIELDS]
+        if msgpack is not None:
+            return msgpack.packb([RECORD_VERSION, values])
+        return (RECORD_VERSION, tuple(values))
+
+    @classmethod
+    def unpack(cls, packed):
+        """Rebuild a record from pack() output; an old layout gives an empty record"""
+        if isinstance(packed, bytes):
+            packed = msgpack.unpackb(packed)
+        version, values = packed
+        record = cls()
+        if version == RECORD_VERSION:
+            for field, value in zip(FIELDS, values):
+                setattr(record, field, value)
+        return record
+
+    def __reduce__(self):
+        return (_unpack, (self.pack(),))
@@ -0,0 +1,34 @@
+import json
+import hashlib
+
+# Financial fields rendered in the profile and ratios fragments of the
+# results page; the price fragment depends on every other field
+PROFILE_FIELDS = ('company_name', 'image', 'industry', 'sector', 'exchange', 'ceo', 'website')
+RATIO_FIELDS = ('peg_ratio', 'beta', 'return_on_equity', 'return_on_assets', 'current_ratio', 'quick_ratio')
+
+def _version(value):
+    """Short content hash of JSON-compatible data"""
+    return hashlib.md5(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+def get_fragment_versions(data):
+    """Version of each cached fragment of an entity's results page
+
+    The results templates key their {% cache %} blocks on these, so a
+    fragment is rendered once per version and only re-rendered after a
+    scrape actually changes the data behind it. Versions are content
+    hashes of just the sections present in ``data``.
+    """
+    versions = {}
+    financials = data.get("financials")
+    if financials is not None:
+        financials = dict(financials)
+        versions["profile"] = _version({k: financials.get(k) for k in PROFILE_FIELDS})
+        versions["ratios"] = _version({k: financials.get(k) for k in RATIO_FIELDS})
+        versions["price"] = _version({
+            k: v for k, v in financials.items()
+            if k not in PROFILE_FIELDS and k not in RATIO_FIELDS and k != 'last_updated'
+        })
+    for section in ("deals", "opinions"):
+        if section in data:
+            versions[section] = _version(data[section])
+    return versions
@@ -0,0 +1,95 @@
+from html.parser import HTMLParser
+
+# Elements that never have content or an end tag, whether or not they are
+# written with "/>"
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'source', 'track', 'wbr',
+})
+
+class ElementExtractor(HTMLParser):
+    """Collect the first element matching each spec in a single streaming pass
+
+    ``specs`` maps a key to a dict of required attributes. The special
+    ``tag`` entry matches the element name and ``class`` matches when all
+    of its space-separated classes are present. No tree is built: only the
+    attributes and text of matched elements are kept, and parsing stops as
+    soon as every spec has been found.
+    """
+
+    def __init__(self, specs):
+        super().__init__(convert_charrefs=True)
+        self.specs = dict(specs)
+        self.results = {}
+        # [key, tag, nesting depth, text parts] per element being captured
+        self._captures = []
+
+    @property
+    def done(self):
+        return not self.specs and not self._captures
+
+    def _matches(self, spec, tag, attrs):
+        for name, wanted in spec.items():
+            if name == 'tag':
+                if tag != wanted:
+                    return False
+            elif name == 'class':
+                if not set(wanted.split()) <= set((attrs.get('class') or '').split()):
+                    return False
+            elif attrs.get(name) != wanted:
+                return False
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            # A capture opened here would wait for an end tag that never comes
+            self.handle_startendtag(tag, attrs)
+            return
+
+        for capture in self._captures:
+            if capture[1] == tag:
+                capture[2] += 1
+
+        if not self.specs:
+            return
+        attrs = dict(attrs)
+        for key, spec in list(self.specs.items()):
+            if self._matches(spec, tag, attrs):
+                del self.specs[key]
+                self.results[key] = {'attrs': attrs, 'text': ''}
+                self._captures.append([key, tag, 1, []])
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing and void elements have no text; record their attributes only
+        attrs = dict(attrs)
+        for key, spec in list(self.specs.items()):
+            if self._matches(spec, tag, attrs):
+                del self.specs[key]
+                self.results[key] = {'attrs': attrs, 'text': ''}
+
+    def handle_endtag(self, tag):
+        for capture in list(self._captures):
+            if capture[1] == tag:
+                capture[2] -= 1
+                if capture[2] == 0:
+                    self.results[capture[0]]['text'] = ''.join(capture[3]).strip()
+                    self._captures.remove(capture)
+
+    def handle_data(self, data):
+        for capture in self._captures:
+            capture[3].append(data)
+
+def extract_elements(html, specs, chunk_size=65536):
+    """Return {key: {'attrs': ..., 'text': ...}} for the first element matching each spec"""
+    parser = ElementExtractor(specs)
+    for i in range(0, len(html), chunk_size):
+        parser.feed(html[i:i + chunk_size])
+        if parser.done:
+            break
+    else:
+        parser.close()
+
+    # Elements left open at the end of the document keep the text seen so far
+    for key, _, _, parts in parser._captures:
+        parser.results[key]['text'] = ''.join(parts).strip()
+    return parser.results
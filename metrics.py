@@ -0,0 +1,163 @@
+import time
+import hashlib
+import threading
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15)
+SIZE_BUCKETS = (1024, 10 * 1024, 50 * 1024, 100 * 1024, 250 * 1024, 500 * 1024, 1024 * 1024)
+
+# Metric values live in the Django cache so that every worker process adds
+# to, and reports, the same totals. The index lists the series to render.
+METRICS_INDEX_KEY = 'scraper_metrics:index'
+
+# Cache counters are integers; histogram sums are kept in millionths
+SUM_SCALE = 1000000
+
+_lock = threading.Lock()
+
+# When this process last made sure each series was in the shared index
+_registered = {}
+
+# Upstream totals for the request being handled, shared with the pool
+# threads it fans out to (see copy_context in the scrapers)
+request_timings = ContextVar('request_timings', default=None)
+
+def _label_key(labels):
+    """Hashable, order-independent form of a label dict"""
+    return tuple(sorted(labels.items()))
+
+def _series_key(name, labels):
+    """Cache key prefix of one labelled series"""
+    digest = hashlib.md5(repr((name, labels)).encode()).hexdigest()[:16]
+    return f"scraper_metrics:{name}:{digest}"
+
+def _register(series, metric_type, name, labels, buckets=None):
+    """List a series in the shared index so render() finds it in every worker"""
+    now = time.time()
+    if now - _registered.get(series, 0) < getattr(settings, 'SCRAPER_METRICS_INDEX_REFRESH', 60):
+        return
+    # Two workers registering at once can overwrite each other's update;
+    # each re-checks its series periodically, which repairs the index
+    index = cache.get(METRICS_INDEX_KEY) or {}
+    if series not in index:
+        index[series] = (metric_type, name, labels, buckets)
+        cache.set(METRICS_INDEX_KEY, index, None)
+    _registered[series] = now
+
+def _incr(key, amount):
+    """Atomically add to a cache counter that never expires"""
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # First use of the counter, or it was evicted
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+
+def inc(name, amount=1, **labels):
+    """Increment a counter"""
+    labels = _label_key(labels)
+    series = _series_key(name, labels)
+    _register(series, 'counter', name, labels)
+    if amount:
+        _incr(series, amount)
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Record a value in a histogram
+
+    Only the bucket the value falls in is incremented; render() makes the
+    counts cumulative.
+    """
+    labels = _label_key(labels)
+    series = _series_key(name, labels)
+    _register(series, 'histogram', name, labels, buckets)
+    bucket = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+    _incr(f"{series}:bucket:{bucket}", 1)
+    _incr(f"{series}:count", 1)
+    _incr(f"{series}:sum", int(round(value * SUM_SCALE)))
+
+def record_upstream_call(host, outcome, elapsed, size=None):
+    """Record one upstream HTTP call in the metrics and the current request's timings"""
+    inc('scraper_upstream_requests_total', host=host, outcome=outcome)
+    observe('scraper_upstream_request_seconds', elapsed, host=host)
+    if size is not None:
+        observe('scraper_upstream_response_bytes', size, buckets=SIZE_BUCKETS, host=host)
+
+    timings = request_timings.get()
+    if timings is not None:
+        with _lock:
+            timings['calls'] += 1
+            timings['seconds'] += elapsed
+
+def _format_labels(labels, extra=()):
+    """Format label pairs as a Prometheus label set"""
+    labels = list(labels) + list(extra)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+def render():
+    """Render all metrics in the Prometheus text exposition format
+
+    Values are totals across every worker sharing the cache, so scrape
+    just one of them.
+    """
+    index = cache.get(METRICS_INDEX_KEY) or {}
+    keys = []
+    for series, (metric_type, _, _, buckets) in index.items():
+        if metric_type == 'counter':
+            keys.append(series)
+        else:
+            keys += [f"{series}:bucket:{i}" for i in range(len(buckets) + 1)]
+            keys += [f"{series}:count", f"{series}:sum"]
+    values = cache.get_many(keys)
+
+    lines = []
+    typed = set()
+    for series, (metric_type, name, labels, buckets) in sorted(index.items(), key=lambda item: item[1][1:3]):
+        if name not in typed:
+            lines.append(f'# TYPE {name} {metric_type}')
+            typed.add(name)
+        if metric_type == 'counter':
+            lines.append(f'{name}{_format_labels(labels)} {values.get(series, 0)}')
+            continue
+
+        cumulative = 0
+        for i, bound in enumerate(buckets):
+            cumulative += values.get(f"{series}:bucket:{i}", 0)
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        count = values.get(f"{series}:count", 0)
+        lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {values.get(f"{series}:sum", 0) / SUM_SCALE}')
+        lines.append(f'{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+class ScraperTimingMiddleware:
+    """Add a Server-Timing header with the upstream calls made for each request
+
+    Enabled with SCRAPER_TIMING_HEADER (defaults to DEBUG).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'SCRAPER_TIMING_HEADER', settings.DEBUG):
+            return self.get_response(request)
+
+        timings = {'calls': 0, 'seconds': 0.0}
+        token = request_timings.set(timings)
+        start = time.monotonic()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_timings.reset(token)
+
+        total = (time.monotonic() - start) * 1000
+        response['Server-Timing'] = (
+            f'upstream;dur={timings["seconds"] * 1000:.1f};desc="{timings["calls"]} calls", '
+            f'total;dur={total:.1f}'
+        )
+        return response
@@ -11,4 +11,27 @@ class UserAlertPrefs(models.Model):
         ('immediate', 'Immediately'),
         ('daily', 'Daily Digest'),
         ('weekly', 'Weekly Summary')
-    ], default='immediate')
\ No newline at end of file
+    ], default='immediate')
+
+class SavedEntity(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_entities')
+    entity = models.ForeignKey(EntityData, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'entity')
+
+class AlertState(models.Model):
+    entity = models.OneToOneField(EntityData, on_delete=models.CASCADE)
+    price_change_percentage = models.FloatField(null=True, blank=True)
+    deal_links = models.JSONField(default=list)
+    opinion_urls = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class PendingAlert(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    entity = models.ForeignKey(EntityData, on_delete=models.CASCADE)
+    alert_type = models.CharField(max_length=20)
+    message = models.TextField()
+    frequency = models.CharField(max_length=10, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import time
+import logging
+from django.core.cache import cache
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# host: (max calls, per seconds), matching each provider's plan quota
+DEFAULT_PROVIDER_LIMITS = {
+    'financialmodelingprep.com': (300, 60),
+    'finnhub.io': (60, 60),
+}
+
+class ProviderUnavailable(Exception):
+    """Raised instead of calling a provider that is throttled or known to be failing"""
+
+def _setting(name, default):
+    """Read a scraper setting, falling back to a default"""
+    return getattr(settings, name, default)
+
+def _allow_rate(host):
+    """Count a call against the host's quota window, returning False once it is spent
+
+    Uses cache.add/incr so the count is shared by every worker. The window
+    is fixed rather than a continuously refilled bucket, since that is what
+    the cache can update atomically.
+    """
+    limits = dict(DEFAULT_PROVIDER_LIMITS, **_setting('SCRAPER_PROVIDER_LIMITS', {}))
+    if host not in limits:
+        return True
+
+    max_calls, per_seconds = limits[host]
+    key = f"health:{host}:calls:{int(time.time() // per_seconds)}"
+    cache.add(key, 0, per_seconds)
+    try:
+        return cache.incr(key) <= max_calls
+    except ValueError:
+        # The window expired between add and incr
+        return True
+
+def before_request(host):
+    """Check the circuit breaker and rate limit for a host, raising ProviderUnavailable"""
+    if cache.get(f"health:{host}:open"):
+        raise ProviderUnavailable(f"Circuit open for {host}")
+
+    if cache.get(f"health:{host}:half_open"):
+        # Cooldown is over: let a single probe through to test the provider
+        if not cache.add(f"health:{host}:probe", 1, _setting('SCRAPER_BREAKER_COOLDOWN', 30)):
+            raise ProviderUnavailable(f"Circuit half-open for {host}, probe in flight")
+
+    if not _allow_rate(host):
+        raise ProviderUnavailable(f"Rate limit reached for {host}")
+
+def record_success(host, elapsed):
+    """Close the breaker for a host and fold the call's latency into its average"""
+    if cache.get(f"health:{host}:half_open"):
+        cache.delete_many([f"health:{host}:half_open", f"health:{host}:probe", f"health:{host}:failures"])
+
+    # Exponentially weighted moving average; concurrent updates may race,
+    # which is fine for a timeout estimate
+    key = f"health:{host}:latency"
+    average = cache.get(key)
+    weight = _setting('SCRAPER_LATENCY_WEIGHT', 0.2)
+    average = elapsed if average is None else (1 - weight) * average + weight * elapsed
+    cache.set(key, average, 86400)
+
+def record_failure(host):
+    """Count a failure for a host, opening its breaker once the threshold is hit"""
+    window = _setting('SCRAPER_BREAKER_WINDOW', 60)
+    cooldown = _setting('SCRAPER_BREAKER_COOLDOWN', 30)
+    key = f"health:{host}:failures"
+    cache.add(key, 0, window)
+    try:
+        failures = cache.incr(key)
+    except ValueError:
+        failures = 1
+
+    probe_failed = cache.get(f"health:{host}:half_open") is not None
+    if probe_failed or failures >= _setting('SCRAPER_BREAKER_THRESHOLD', 5):
+        logger.error(f"Opening circuit for {host} after {failures} failures")
+        cache.set(f"health:{host}:open", 1, cooldown)
+        # Half-open outlives the open flag, so the first call after the
+        # cooldown becomes the probe
+        cache.set(f"health:{host}:half_open", 1, cooldown + window)
+        cache.delete_many([f"health:{host}:probe", key])
+
+def get_timeout(host, timeout):
+    """Adapt a request timeout to the host's observed latency
+
+    Uses a multiple of the average latency, clamped between
+    SCRAPER_TIMEOUT_FLOOR and the caller's timeout, so a slow provider is
+    abandoned long before the caller's worst-case timeout.
+    """
+    average = cache.get(f"health:{host}:latency")
+    if average is None:
+        return timeout
+    adaptive = average * _setting('SCRAPER_TIMEOUT_MULTIPLIER', 4)
+    return max(_setting('SCRAPER_TIMEOUT_FLOOR', 2), min(timeout, adaptive))
@@ -0,0 +1,128 @@
+import time
+import threading
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from . import budget, metrics, provider_health
+
+logger = logging.getLogger(__name__)
+
+_sessions = {}
+_host_limits = {}
+_lock = threading.Lock()
+_subrequest_executor = None
+
+def _get_host_limit(host):
+    """Return the semaphore bounding concurrent requests to a host"""
+    limit = _host_limits.get(host)
+    if limit is None:
+        with _lock:
+            limit = _host_limits.get(host)
+            if limit is None:
+                per_host = getattr(settings, 'SCRAPER_HOST_CONCURRENCY', {})
+                default = getattr(settings, 'SCRAPER_DEFAULT_HOST_CONCURRENCY', 4)
+                limit = threading.BoundedSemaphore(per_host.get(host, default))
+                _host_limits[host] = limit
+    return limit
+
+def get_session(host):
+    """Return the pooled keep-alive session for a host, creating it on first use"""
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                pool_size = getattr(settings, 'SCRAPER_POOL_SIZE', 10)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[host] = session
+    return session
+
+def _resolve_url(url, host):
+    """Point a URL at the stand-in configured for its host in SCRAPER_UPSTREAM_OVERRIDES
+
+    Overrides map a provider host to a base URL, e.g. a local replay server
+    in the benchmarks. The path and query are kept.
+    """
+    base = getattr(settings, 'SCRAPER_UPSTREAM_OVERRIDES', {}).get(host)
+    if not base:
+        return url
+    parts = urlsplit(url)
+    return base.rstrip('/') + urlunsplit(('', '', parts.path, parts.query, ''))
+
+def http_get(url, timeout=10, headers=None):
+    """GET a URL through the host's pooled session, honouring its concurrency limit
+
+    Raises ProviderUnavailable without touching the network when the host's
+    circuit breaker is open or its rate limit is spent. Connection errors,
+    429s and 5xx responses count as provider failures. Health, limits and
+    metrics are tracked against the original host even when the URL is
+    overridden.
+    """
+    host = urlsplit(url).netloc
+    url = _resolve_url(url, host)
+    try:
+        provider_health.before_request(host)
+    except provider_health.ProviderUnavailable:
+        metrics.inc('scraper_upstream_requests_total', host=host, outcome='unavailable')
+        raise
+    timeout = provider_health.get_timeout(host, timeout)
+    
+    try:
+        with _get_host_limit(host):
+            # Time the request itself, not the wait for a free slot
+            start = time.monotonic()
+            try:
+                response = get_session(host).get(url, headers=headers, timeout=timeout)
+            finally:
+                elapsed = time.monotonic() - start
+    except requests.RequestException:
+        provider_health.record_failure(host)
+        metrics.record_upstream_call(host, 'error', elapsed)
+        budget.record_upstream_call()
+        raise
+    
+    budget.record_upstream_call()
+    if response.status_code == 429 or response.status_code >= 500:
+        provider_health.record_failure(host)
+        metrics.record_upstream_call(host, 'http_error', elapsed, len(response.content))
+    else:
+        provider_health.record_success(host, elapsed)
+        metrics.record_upstream_call(host, 'ok', elapsed, len(response.content))
+    return response
+
+def get_json(url, timeout=10, headers=None):
+    """GET a URL and decode its JSON body"""
+    return http_get(url, timeout=timeout, headers=headers).json()
+
+def _get_subrequest_executor():
+    """Return the pool used for concurrent sub-requests within a provider"""
+    global _subrequest_executor
+    if _subrequest_executor is None:
+        with _lock:
+            if _subrequest_executor is None:
+                _subrequest_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SCRAPER_HTTP_WORKERS', 16),
+                    thread_name_prefix='scraper-http',
+                )
+    return _subrequest_executor
+
+def get_json_many(urls, timeout=10, headers=None):
+    """GET several URLs concurrently and return their decoded JSON bodies in order
+
+    Kept on its own pool, separate from the per-entity fan-out, so provider
+    functions running on that pool can never deadlock waiting for a slot.
+    The first failing request's exception is re-raised.
+    """
+    executor = _get_subrequest_executor()
+    futures = [
+        executor.submit(contextvars.copy_context().run, get_json, url, timeout, headers)
+        for url in urls
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,63 @@
+from django.db import models
+
+# Storage for the scrapers' symbol index, snapshot history and feed items.
+# These belong to the core app, next to the modules that use them.
+
+class CompanySymbol(models.Model):
+    symbol = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, db_index=True)
+    exchange = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'core'
+
+    def __str__(self):
+        return f"{self.symbol} ({self.name})"
+
+class FinancialSnapshot(models.Model):
+    symbol = models.CharField(max_length=20)
+    captured_at = models.DateTimeField()
+    resolution = models.CharField(max_length=4, choices=[
+        ('raw', 'Raw'),
+        ('hour', 'Hourly'),
+        ('day', 'Daily')
+    ], default='raw')
+    price = models.FloatField(null=True)
+    price_change_percentage = models.FloatField(null=True)
+    day_high = models.FloatField(null=True)
+    day_low = models.FloatField(null=True)
+    volume = models.BigIntegerField(null=True)
+    market_cap = models.FloatField(null=True)
+    pe_ratio = models.FloatField(null=True)
+    eps = models.FloatField(null=True)
+    dividend_yield = models.FloatField(null=True)
+
+    class Meta:
+        app_label = 'core'
+        indexes = [models.Index(fields=['symbol', 'resolution', 'captured_at'])]
+
+class FeedState(models.Model):
+    feed_key = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    fetched_at = models.DateTimeField(null=True)
+
+    class Meta:
+        app_label = 'core'
+        unique_together = ('feed_key', 'kind')
+
+class FeedItem(models.Model):
+    feed_key = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10)
+    item_hash = models.CharField(max_length=40)
+    payload = models.JSONField()
+    published_at = models.DateTimeField(null=True)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'core'
+        unique_together = ('feed_key', 'kind', 'item_hash')
+        indexes = [models.Index(fields=['feed_key', 'kind', '-published_at'])]
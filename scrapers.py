@@ -1,15 +1,181 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from xml.etree import ElementTree
 import re
 import time
 import logging
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from urllib.parse import quote_plus
 from django.core.cache import cache
 from django.conf import settings
+from django.db import connections
+from .scraper_http import http_get, get_json, get_json_many
+from .caching import cached_fetch, claim_flight, get_cached, is_stale, revalidate, set_cached, unwrap
+from . import budget, metrics, symbols
+from .snapshots import record_snapshots
+from .ingest import ingest_feed, get_feed_page
+from .html_extract import extract_elements
+from .financials import FinancialRecord, parse_number, parse_range
+from .fragments import get_fragment_versions
+from .screening import load_cached_financials, load_financials
 
 logger = logging.getLogger(__name__)
 
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Return the shared, bounded thread pool used for per-entity fan-out"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SCRAPER_MAX_WORKERS', 8),
+                    thread_name_prefix='scraper',
+                )
+    return _executor
+
+def _call_in_worker(func, *args):
+    """Run func on a pool thread, releasing any DB connection it opened"""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+def iter_with_deadline(calls, deadline):
+    """Run independent calls concurrently and yield them as they complete.
+
+    ``calls`` maps a section name to a ``(func, *args)`` tuple. Yields
+    ``(name, status, result)`` where status is "ok", "empty", "error" or
+    "timeout". Calls still running when the deadline expires are reported as
+    timed out but left to finish in the background, so they still warm the cache.
+    """
+    executor = _get_executor()
+    futures = {
+        executor.submit(contextvars.copy_context().run, _call_in_worker, *call): name
+        for name, call in calls.items()
+    }
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            pending.discard(future)
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Scraper task {name} failed: {str(e)}")
+                yield name, "error", None
+                continue
+            yield name, "ok" if result else "empty", result
+    except FuturesTimeoutError:
+        pass
+    
+    for future in pending:
+        yield futures[future], "timeout", None
+
+def run_with_deadline(calls, deadline):
+    """Run independent calls concurrently, returning (results, status) dicts"""
+    results = {}
+    status = {}
+    for name, call_status, result in iter_with_deadline(calls, deadline):
+        status[name] = call_status
+        if result:
+            results[name] = result
+    return results, status
+
+def _format_fmp_quote(quote):
+    """Map an FMP quote record onto our financial fields"""
+    if not quote:
+        return {}
+    return {
+        "current_price": quote.get('price'),
+        "price_change": quote.get('change'),
+        "price_change_percentage": quote.get('changesPercentage'),
+        "day_high": quote.get('dayHigh'),
+        "day_low": quote.get('dayLow'),
+        "year_high": quote.get('yearHigh'),
+        "year_low": quote.get('yearLow'),
+        "volume": quote.get('volume'),
+        "avg_volume": quote.get('avgVolume'),
+        "market_cap": quote.get('marketCap'),
+        "open": quote.get('open'),
+        "previous_close": quote.get('previousClose'),
+        "eps": quote.get('eps'),
+        "pe_ratio": quote.get('pe'),
+    }
+
+def _format_fmp_profile(profile):
+    """Map an FMP profile record onto our financial fields"""
+    if not profile:
+        return {}
+    return {
+        "company_name": profile.get('companyName'),
+        "currency": profile.get('currency'),
+        "exchange": profile.get('exchange'),
+        "industry": profile.get('industry'),
+        "sector": profile.get('sector'),
+        "description": profile.get('description'),
+        "ceo": profile.get('ceo'),
+        "website": profile.get('website'),
+        "image": profile.get('image'),
+    }
+
+def _as_percent(fraction):
+    """Convert a fraction such as 0.0051 to percent, keeping None"""
+    value = parse_number(fraction)
+    return value * 100 if value is not None else None
+
+def _format_fmp_ratios(ratios):
+    """Map an FMP TTM ratios record onto our financial fields
+
+    FMP gives yields, margins and returns as fractions; our fields are in
+    percent.
+    """
+    if not ratios:
+        return {}
+    return {
+        "dividend_yield": _as_percent(ratios.get('dividendYielTTM')),
+        "pe_ratio_ttm": ratios.get('peRatioTTM'),
+        "peg_ratio": ratios.get('pegRatioTTM'),
+        "payout_ratio": _as_percent(ratios.get('payoutRatioTTM')),
+        "current_ratio": ratios.get('currentRatioTTM'),
+        "quick_ratio": ratios.get('quickRatioTTM'),
+        "gross_profit_margin": _as_percent(ratios.get('grossProfitMarginTTM')),
+        "operating_profit_margin": _as_percent(ratios.get('operatingProfitMarginTTM')),
+        "net_profit_margin": _as_percent(ratios.get('netProfitMarginTTM')),
+        "return_on_assets": _as_percent(ratios.get('returnOnAssetsTTM')),
+        "return_on_equity": _as_percent(ratios.get('returnOnEquityTTM')),
+    }
+
+def _get_provider_json(provider, symbol, urls):
+    """Fetch a provider's endpoints concurrently, reusing cached profile/ratio responses
+
+    ``urls`` maps a data kind ('quote', 'profile' or 'ratios') to its URL.
+    Profiles and ratios change far less often than prices, so their
+    responses are cached for their own kind's TTL and only refetched once
+    expired. Quotes are always fetched.
+    """
+    keys = {kind: f"{provider}_{kind}_{symbol}" for kind in urls if kind != "quote"}
+    cached = cache.get_many(keys.values())
+    responses = {}
+    for kind, key in keys.items():
+        body = unwrap(cached.get(key))
+        if body:
+            responses[kind] = body
+    
+    missing = [kind for kind in urls if kind not in responses]
+    for kind, body in zip(missing, get_json_many([urls[kind] for kind in missing])):
+        responses[kind] = body
+        if kind in keys and body and 'Error Message' not in body and 'error' not in body:
+            set_cached(keys[kind], body, kind)
+    return responses
+
 def get_financial_modeling_prep_data(symbol):
     """Get financial data from Financial Modeling Prep API"""
     if not settings.FINANCIAL_MODELING_PREP_API_KEY:
@@ -17,84 +183,32 @@ def get_financial_modeling_prep_data(symbol):
         return {}
     
     try:
-        # Get company profile
-        profile_url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
-        profile_response = requests.get(profile_url, timeout=10)
-        profile_data = profile_response.json()
+        api_key = settings.FINANCIAL_MODELING_PREP_API_KEY
+        responses = _get_provider_json("fmp", symbol, {
+            "profile": f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={api_key}",
+            "quote": f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={api_key}",
+            "ratios": f"https://financialmodelingprep.com/api/v3/ratios-ttm/{symbol}?apikey={api_key}",
+        })
+        profile_data, quote_data, ratios_data = responses["profile"], responses["quote"], responses["ratios"]
         
         if not profile_data or 'Error Message' in profile_data:
             return {}
         
         profile = profile_data[0] if isinstance(profile_data, list) and len(profile_data) > 0 else {}
-        
-        # Get stock price
-        quote_url = f"https://financialmodelingprep.com/api/v3/quote/{symbol}?apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
-        quote_response = requests.get(quote_url, timeout=10)
-        quote_data = quote_response.json()
-        
         quote = quote_data[0] if isinstance(quote_data, list) and len(quote_data) > 0 else {}
-        
-        # Get financial ratios
-        ratios_url = f"https://financialmodelingprep.com/api/v3/ratios-ttm/{symbol}?apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
-        ratios_response = requests.get(ratios_url, timeout=10)
-        ratios_data = ratios_response.json()
-        
         ratios = ratios_data[0] if isinstance(ratios_data, list) and len(ratios_data) > 0 else {}
         
         # Format the data
         financials = {}
-        
-        if quote:
-            financials.update({
-                "current_price": quote.get('price'),
-                "price_change": quote.get('change'),
-                "price_change_percentage": quote.get('changesPercentage'),
-                "day_high": quote.get('dayHigh'),
-                "day_low": quote.get('dayLow'),
-                "year_high": quote.get('yearHigh'),
-                "year_low": quote.get('yearLow'),
-                "volume": quote.get('volume'),
-                "avg_volume": quote.get('avgVolume'),
-                "market_cap": quote.get('marketCap'),
-                "open": quote.get('open'),
-                "previous_close": quote.get('previousClose'),
-                "eps": quote.get('eps'),
-                "pe_ratio": quote.get('pe'),
-            })
-        
-        if profile:
-            financials.update({
-                "company_name": profile.get('companyName'),
-                "currency": profile.get('currency'),
-                "exchange": profile.get('exchange'),
-                "industry": profile.get('industry'),
-                "sector": profile.get('sector'),
-                "description": profile.get('description'),
-                "ceo": profile.get('ceo'),
-                "website": profile.get('website'),
-                "image": profile.get('image'),
-            })
-        
-        if ratios:
-            financials.update({
-                "dividend_yield": ratios.get('dividendYielTTM'),
-                "pe_ratio_ttm": ratios.get('peRatioTTM'),
-                "peg_ratio": ratios.get('pegRatioTTM'),
-                "payout_ratio": ratios.get('payoutRatioTTM'),
-                "current_ratio": ratios.get('currentRatioTTM'),
-                "quick_ratio": ratios.get('quickRatioTTM'),
-                "gross_profit_margin": ratios.get('grossProfitMarginTTM'),
-                "operating_profit_margin": ratios.get('operatingProfitMarginTTM'),
-                "net_profit_margin": ratios.get('netProfitMarginTTM'),
-                "return_on_assets": ratios.get('returnOnAssetsTTM'),
-                "return_on_equity": ratios.get('returnOnEquityTTM'),
-            })
+        financials.update(_format_fmp_quote(quote))
+        financials.update(_format_fmp_profile(profile))
+        financials.update(_format_fmp_ratios(ratios))
         
         if financials:
             financials["source"] = "Financial Modeling Prep"
             financials["last_updated"] = datetime.now().isoformat()
         
-        return financials
+        return FinancialRecord.from_dict(financials)
         
     except Exception as e:
         logger.error(f"Financial Modeling Prep API error for symbol {symbol}: {str(e)}")
@@ -107,24 +221,17 @@ def get_finnhub_data(symbol):
         return {}
     
     try:
-        # Get quote data
-        quote_url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={settings.FINNHUB_API_KEY}"
-        quote_response = requests.get(quote_url, timeout=10)
-        quote_data = quote_response.json()
+        api_key = settings.FINNHUB_API_KEY
+        responses = _get_provider_json("finnhub", symbol, {
+            "quote": f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={api_key}",
+            "profile": f"https://finnhub.io/api/v1/stock/profile2?symbol={symbol}&token={api_key}",
+            "ratios": f"https://finnhub.io/api/v1/stock/metric?symbol={symbol}&metric=all&token={api_key}",
+        })
+        quote_data, profile_data, metrics_data = responses["quote"], responses["profile"], responses["ratios"]
         
         if 'error' in quote_data:
             return {}
         
-        # Get company profile
-        profile_url = f"https://finnhub.io/api/v1/stock/profile2?symbol={symbol}&token={settings.FINNHUB_API_KEY}"
-        profile_response = requests.get(profile_url, timeout=10)
-        profile_data = profile_response.json()
-        
-        # Get company metrics
-        metrics_url = f"https://finnhub.io/api/v1/stock/metric?symbol={symbol}&metric=all&token={settings.FINNHUB_API_KEY}"
-        metrics_response = requests.get(metrics_url, timeout=10)
-        metrics_data = metrics_response.json()
-        
         # Format the data
         financials = {}
         
@@ -146,18 +253,21 @@ def get_finnhub_data(symbol):
                 "exchange": profile_data.get('exchange'),
                 "industry": profile_data.get('finnhubIndustry'),
                 "website": profile_data.get('weburl'),
-                "logo": profile_data.get('logo'),
+                "image": profile_data.get('logo'),
             })
         
         if metrics_data and 'metric' in metrics_data:
             metrics = metrics_data['metric']
+            # Finnhub reports market capitalization in millions
+            market_cap = parse_number(metrics.get('marketCapitalization'))
             financials.update({
-                "market_cap": metrics.get('marketCapitalization'),
+                "market_cap": market_cap * 1e6 if market_cap is not None else None,
                 "pe_ratio": metrics.get('peNormalizedAnnual'),
                 "peg_ratio": metrics.get('pegRatio'),
+                "beta": metrics.get('beta'),
                 "dividend_yield": metrics.get('dividendYieldIndicatedAnnual'),
-                "52_week_high": metrics.get('52WeekHigh'),
-                "52_week_low": metrics.get('52WeekLow'),
+                "year_high": metrics.get('52WeekHigh'),
+                "year_low": metrics.get('52WeekLow'),
                 "eps": metrics.get('epsNormalizedAnnual'),
             })
         
@@ -165,12 +275,76 @@ def get_finnhub_data(symbol):
             financials["source"] = "Finnhub"
             financials["last_updated"] = datetime.now().isoformat()
         
-        return financials
+        return FinancialRecord.from_dict(financials)
         
     except Exception as e:
         logger.error(f"Finnhub API error for symbol {symbol}: {str(e)}")
         return {}
 
+# Yahoo quote page data-test ids and the fields they map to; ranges, bid/ask
+# and dividends are split into our fields by _normalize_yahoo_metrics
+YAHOO_METRIC_FIELDS = {
+    'PREV_CLOSE-value': 'previous_close',
+    'OPEN-value': 'open_price',
+    'BID-value': 'bid',
+    'ASK-value': 'ask',
+    'DAYS_RANGE-value': 'day_range',
+    'FIFTY_TWO_WK_RANGE-value': 'fifty_two_week_range',
+    'VOLUME-value': 'volume',
+    'AVG_VOLUME_3MONTH-value': 'avg_volume',
+    'MARKET_CAP-value': 'market_cap',
+    'BETA_5Y-value': 'beta',
+    'PE_RATIO-value': 'pe_ratio',
+    'EPS_RATIO-value': 'eps',
+    'EARNINGS_DATE-value': 'earnings_date',
+    'DIVIDEND_AND_YIELD-value': 'dividend_yield',
+    'EX_DIVIDEND_DATE-value': 'ex_dividend_date',
+    'ONE_YEAR_TARGET_PRICE-value': 'target_price'
+}
+
+# Everything read from a Yahoo quote page, collected in one parsing pass
+YAHOO_QUOTE_SPECS = {
+    'price_streamer': {'tag': 'fin-streamer', 'data-field': 'regularMarketPrice'},
+    'price_test': {'data-test': 'qsp-price'},
+    'price_class': {'class': 'Fw(b) Fz(36px)'},
+    'market_cap_field': {'data-field': 'marketCap'},
+}
+YAHOO_QUOTE_SPECS.update({test_id: {'data-test': test_id} for test_id in YAHOO_METRIC_FIELDS})
+
+# Lookup order for values with several possible selectors
+YAHOO_PRICE_KEYS = ['price_streamer', 'price_test', 'price_class']
+YAHOO_MARKET_CAP_KEYS = ['MARKET_CAP-value', 'market_cap_field']
+
+YAHOO_NAME_SPECS = {
+    'title': {'tag': 'title'},
+    'page_title': {'tag': 'h1', 'data-test': 'qsp-page-title'},
+}
+
+# The first symbol cell on a lookup page belongs to the first result row
+YAHOO_LOOKUP_SPECS = {
+    'symbol_cell': {'tag': 'td', 'aria-label': 'Symbol'},
+    'name_cell': {'tag': 'td', 'aria-label': 'Name'},
+}
+
+def _normalize_yahoo_metrics(metrics):
+    """Split Yahoo's combined display values into our financial fields"""
+    normalized = dict(metrics)
+    normalized["open"] = normalized.pop("open_price", None)
+    normalized["day_low"], normalized["day_high"] = parse_range(normalized.pop("day_range", None))
+    normalized["year_low"], normalized["year_high"] = parse_range(normalized.pop("fifty_two_week_range", None))
+    
+    # Bid and ask read "189.80 x 100"; keep the price
+    for field in ("bid", "ask"):
+        if normalized.get(field):
+            normalized[field] = normalized[field].split(" x ")[0]
+    
+    # Dividends read "0.96 (0.51%)"; keep the yield
+    dividend = normalized.get("dividend_yield")
+    if dividend:
+        match = re.search(r'\(([^)]*)%\)', dividend)
+        normalized["dividend_yield"] = match.group(1) if match else None
+    return normalized
+
 def get_yahoo_finance_data(symbol):
     """Get financial data from Yahoo Finance as a fallback"""
     try:
@@ -179,65 +353,32 @@ def get_yahoo_finance_data(symbol):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=15)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = http_get(url, headers=headers, timeout=15)
+        found = extract_elements(response.text, YAHOO_QUOTE_SPECS)
         
         # Extract price using multiple possible selectors
         price = None
-        price_selectors = [
-            'fin-streamer[data-field="regularMarketPrice"]',
-            '[data-test="qsp-price"]',
-            '.Fw\(b\).Fz\(36px\)',
-            '[data-symbol="{symbol}"][data-field="regularMarketPrice"]'
-        ]
-        
-        for selector in price_selectors:
-            element = soup.select_one(selector)
+        for key in YAHOO_PRICE_KEYS:
+            element = found.get(key)
             if element:
-                price = element.get('value') or element.text.strip()
+                price = element['attrs'].get('value') or element['text']
                 if price:
                     break
         
         # Extract market cap
         market_cap = None
-        market_cap_selectors = [
-            '[data-test="MARKET_CAP-value"]',
-            'td[data-test="MARKET_CAP-value"]',
-            '[data-field="marketCap"]'
-        ]
-        
-        for selector in market_cap_selectors:
-            element = soup.select_one(selector)
-            if element:
-                market_cap = element.text.strip()
-                if market_cap:
-                    break
+        for key in YAHOO_MARKET_CAP_KEYS:
+            element = found.get(key)
+            if element and element['text']:
+                market_cap = element['text']
+                break
         
         # Extract other financial metrics
         metrics = {}
-        metric_mappings = {
-            'PREV_CLOSE-value': 'previous_close',
-            'OPEN-value': 'open_price',
-            'BID-value': 'bid',
-            'ASK-value': 'ask',
-            'DAYS_RANGE-value': 'day_range',
-            'FIFTY_TWO_WK_RANGE-value': 'fifty_two_week_range',
-            'VOLUME-value': 'volume',
-            'AVG_VOLUME_3MONTH-value': 'avg_volume',
-            'MARKET_CAP-value': 'market_cap',
-            'BETA_5Y-value': 'beta',
-            'PE_RATIO-value': 'pe_ratio',
-            'EPS_RATIO-value': 'eps',
-            'EARNINGS_DATE-value': 'earnings_date',
-            'DIVIDEND_AND_YIELD-value': 'dividend_yield',
-            'EX_DIVIDEND_DATE-value': 'ex_dividend_date',
-            'ONE_YEAR_TARGET_PRICE-value': 'target_price'
-        }
-        
-        for test_id, metric_name in metric_mappings.items():
-            element = soup.find(attrs={"data-test": test_id})
+        for test_id, metric_name in YAHOO_METRIC_FIELDS.items():
+            element = found.get(test_id)
             if element:
-                metrics[metric_name] = element.text.strip()
+                metrics[metric_name] = element['text']
         
         # If we got any data, return it
         if price or market_cap or metrics:
@@ -247,8 +388,8 @@ def get_yahoo_finance_data(symbol):
                 "source": "Yahoo Finance",
                 "last_updated": datetime.now().isoformat()
             }
-            result.update(metrics)
-            return result
+            result.update(_normalize_yahoo_metrics(metrics))
+            return FinancialRecord.from_dict(result)
             
     except Exception as e:
         logger.error(f"Yahoo Finance error for symbol {symbol}: {str(e)}")
@@ -257,14 +398,26 @@ def get_yahoo_finance_data(symbol):
 
 def get_company_name_from_symbol(symbol):
     """Get company name from symbol using Financial Modeling Prep"""
+    # Check the local symbol index first
+    name = symbols.lookup_name(symbol)
+    if name:
+        return name
+    
+    # Reuse a profile the FMP provider already fetched
+    profile_data = get_cached(f"fmp_profile_{symbol}")
+    if profile_data and isinstance(profile_data, list) and profile_data[0].get('companyName'):
+        symbols.remember(symbol, profile_data[0]['companyName'], profile_data[0].get('exchangeShortName', ''))
+        return profile_data[0]['companyName']
+    
     try:
         if settings.FINANCIAL_MODELING_PREP_API_KEY:
             url = f"https://financialmodelingprep.com/api/v3/profile/{symbol}?apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
-            response = requests.get(url, timeout=10)
-            data = response.json()
+            data = get_json(url, timeout=10)
             
             if data and isinstance(data, list) and len(data) > 0:
-                return data[0].get('companyName', symbol)
+                name = data[0].get('companyName')
+                symbols.remember(symbol, name, data[0].get('exchangeShortName', ''))
+                return name or symbol
         
         # Fallback to Yahoo Finance
         url = f"https://finance.yahoo.com/quote/{symbol}"
@@ -272,21 +425,23 @@ def get_company_name_from_symbol(symbol):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = http_get(url, headers=headers, timeout=10)
+        found = extract_elements(response.text, YAHOO_NAME_SPECS)
         
         # Try to extract company name from title
-        title = soup.find('title')
+        title = found.get('title')
         if title:
-            name = title.text.split('(')[0].strip()
+            name = title['text'].split('(')[0].strip()
             if name and name != 'Quote':
+                symbols.remember(symbol, name)
                 return name
         
         # Try to extract from h1
-        h1 = soup.find('h1', {'data-test': 'qsp-page-title'})
+        h1 = found.get('page_title')
         if h1:
-            name = h1.text.split('(')[0].strip()
+            name = h1['text'].split('(')[0].strip()
             if name:
+                symbols.remember(symbol, name)
                 return name
                 
     except Exception as e:
@@ -294,105 +449,350 @@ def get_company_name_from_symbol(symbol):
     
     return symbol
 
+def _has_values(data):
+    """Check whether a provider returned anything beyond its metadata"""
+    return bool(data) and any(v is not None for k, v in data.items() if k not in ['source', 'last_updated'])
+
+def _has_price(data):
+    """Check whether financial data is usable enough to cache"""
+    return bool(data) and bool(data.get('current_price') or data.get('market_cap'))
+
+def fetch_financial_data(symbol):
+    """Fetch financial data from the providers, bypassing the cache"""
+    # Try Financial Modeling Prep first (most reliable), then Finnhub, then
+    # Yahoo Finance as a fallback
+    providers = [
+        ("fmp", get_financial_modeling_prep_data),
+        ("finnhub", get_finnhub_data),
+        ("yahoo", get_yahoo_finance_data),
+    ]
+    data = {}
+    for provider, get_data in providers:
+        start = time.monotonic()
+        data = get_data(symbol)
+        metrics.observe('scraper_provider_seconds', time.monotonic() - start, provider=provider)
+        if _has_values(data):
+            metrics.inc('scraper_provider_results_total', provider=provider, outcome='data')
+            break
+        metrics.inc('scraper_provider_results_total', provider=provider, outcome='fallthrough')
+    
+    # If we got data, add company name and keep a snapshot of it
+    if _has_price(data):
+        if not data.get('company_name'):
+            data.company_name = get_company_name_from_symbol(symbol)
+        else:
+            symbols.remember(symbol, data['company_name'], data.get('exchange'))
+        record_snapshots([(symbol, data)])
+    
+    return data
+
 def get_financial_data(symbol):
-    """Main function to get financial data with multiple sources"""
-    # Check cache first
-    cache_key = f"financial_data_{symbol}"
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
+    """Main function to get financial data with multiple sources
+
+    Cached stale-while-revalidate with the 'quote' TTLs: stale data is
+    served immediately while a background refresh runs, and symbols no
+    provider knows are cached negatively for a short while.
+    """
+    return cached_fetch(
+        f"financial_data_{symbol}",
+        lambda: fetch_financial_data(symbol),
+        'quote',
+        is_valid=_has_price,
+    )
+
+def _get_fmp_batch(symbols):
+    """Get quote and profile data for a batch of symbols in one round-trip per endpoint"""
+    api_key = settings.FINANCIAL_MODELING_PREP_API_KEY
+    joined = ",".join(symbols)
+    quote_data, profile_data = get_json_many([
+        f"https://financialmodelingprep.com/api/v3/quote/{joined}?apikey={api_key}",
+        f"https://financialmodelingprep.com/api/v3/profile/{joined}?apikey={api_key}",
+    ])
     
-    # Try Financial Modeling Prep first (most reliable)
-    data = get_financial_modeling_prep_data(symbol)
+    quotes = {q.get('symbol'): q for q in quote_data} if isinstance(quote_data, list) else {}
+    profiles = {p.get('symbol'): p for p in profile_data} if isinstance(profile_data, list) else {}
     
-    # If Financial Modeling Prep fails, try Finnhub
-    if not data or all(v is None for k, v in data.items() if k not in ['source', 'last_updated']):
-        data = get_finnhub_data(symbol)
+    results = {}
+    for symbol in symbols:
+        financials = FinancialRecord.from_dict(_format_fmp_quote(quotes.get(symbol)))
+        financials.update(_format_fmp_profile(profiles.get(symbol)))
+        if _has_price(financials):
+            financials.source = "Financial Modeling Prep"
+            financials.last_updated = datetime.now().isoformat()
+            results[symbol] = financials
+    return results
+
+def revalidate_financials(symbols):
+    """Refresh the cached financials of symbols in the background, once per symbol across workers"""
+    for symbol in symbols:
+        revalidate(
+            f"financial_data_{symbol}",
+            lambda symbol=symbol: fetch_financial_data(symbol),
+            'quote',
+            is_valid=_has_price,
+        )
+
+def get_financial_data_bulk(symbols, deadline=None):
+    """Get financial data for many symbols at once
+
+    Serves what it can from the ``financial_data_{symbol}`` cache, fetches
+    the rest from FMP's comma-separated quote/profile endpoints in batches of
+    ``SCRAPER_FMP_BATCH_SIZE``, and falls back to ``get_financial_data`` per
+    symbol for anything the batch didn't cover. Batched results lack ratios,
+    so they are cached under ``financial_summary_{symbol}`` rather than
+    replacing the full per-symbol entry. Stale cached symbols are served as
+    is and refreshed in the background. Clients over their request budget
+    get the cached or stored financials only. Returns a dict keyed by symbol.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'SCRAPER_ENTITY_DEADLINE', 12)
     
-    # If Finnhub fails, try Yahoo Finance as fallback
-    if not data or all(v is None for k, v in data.items() if k not in ['source', 'last_updated']):
-        data = get_yahoo_finance_data(symbol)
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    if budget.cache_only():
+        return load_financials(symbols)
     
-    # If we got data, add company name and cache it
-    if data and (data.get('current_price') or data.get('market_cap')):
-        if not data.get('company_name'):
-            data['company_name'] = get_company_name_from_symbol(symbol)
+    results, stale = load_cached_financials(symbols)
+    if stale:
+        revalidate_financials(stale)
+    metrics.inc('scraper_cache_lookups_total', len(results) - len(stale), kind='bulk', result='fresh')
+    metrics.inc('scraper_cache_lookups_total', len(stale), kind='bulk', result='stale')
+    metrics.inc('scraper_cache_lookups_total', len(symbols) - len(results), kind='bulk', result='miss')
+    
+    missing = [s for s in symbols if s not in results]
+    
+    if missing and settings.FINANCIAL_MODELING_PREP_API_KEY:
+        batch_size = getattr(settings, 'SCRAPER_FMP_BATCH_SIZE', 50)
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            try:
+                batch_results = _get_fmp_batch(batch)
+            except Exception as e:
+                logger.error(f"Financial Modeling Prep batch error for {len(batch)} symbols: {str(e)}")
+                continue
+            
+            if batch_results:
+                for s, d in batch_results.items():
+                    set_cached(f"financial_summary_{s}", d, 'quote')
+                record_snapshots(batch_results.items())
+                results.update(batch_results)
         
-        # Cache for 10 minutes to avoid rate limiting
-        cache.set(cache_key, data, 600)
+        missing = [s for s in missing if s not in results]
     
-    return data
+    # Anything left goes through the regular per-symbol provider chain
+    if missing:
+        fetched, _ = run_with_deadline({s: (get_financial_data, s) for s in missing}, deadline)
+        results.update(fetched)
+    
+    return results
+
+def _parse_google_news(response):
+    """Parse a Google News RSS response into (link, published_at, deal) tuples"""
+    items = []
+    for item in ElementTree.fromstring(response.content).iter('item'):
+        title = item.findtext('title', '')
+        link = item.findtext('link', '')
+        date = item.findtext('pubDate', '')
+        if not link:
+            continue
+        
+        # Clean up the title
+        title = re.sub(r' - [^-]+$', '', title)
+        
+        try:
+            published_at = parsedate_to_datetime(date) if date else None
+        except (TypeError, ValueError):
+            published_at = None
+        
+        items.append((link, published_at, {
+            "title": title,
+            "link": link,
+            "date": date,
+            "source": "Google News"
+        }))
+    return items
+
+def _parse_reddit_opinions(response):
+    """Parse a Reddit search response into (permalink, published_at, opinion) tuples"""
+    items = []
+    posts = response.json().get('data', {}).get('children', [])
+    
+    for post in posts:
+        post_data = post.get('data', {})
+        title = post_data.get('title', '')
+        permalink = post_data.get('permalink', '')
+        # Skip if it's just a stock symbol
+        if not permalink or (len(title.split()) <= 2 and any(char.isdigit() for char in title)):
+            continue
+        
+        created = datetime.fromtimestamp(post_data.get('created_utc', 0), tz=dt_timezone.utc)
+        items.append((permalink, created, {
+            "source": "Reddit",
+            "text": title,
+            "score": post_data.get('score', 0),
+            "url": f"https://reddit.com{permalink}",
+            "date": created.strftime('%Y-%m-%d'),
+            "subreddit": post_data.get('subreddit', '')
+        }))
+    return items
+
+# Financial fields shown per result on the search page, keyed by the name
+# the search template uses
+SEARCH_RESULT_FIELDS = {
+    "current_price": "current_price",
+    "currency": "currency",
+    "market_cap": "market_cap",
+    "pe_ratio": "pe_ratio",
+    "52_week_high": "year_high",
+    "52_week_low": "year_low",
+    "dividend_yield": "dividend_yield",
+}
+
+def _search_fmp_symbols(query, limit):
+    """Search FMP for symbols matching a query"""
+    if not settings.FINANCIAL_MODELING_PREP_API_KEY:
+        return []
+    search_url = f"https://financialmodelingprep.com/api/v3/search?query={quote_plus(query)}&limit={limit}&apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
+    data = get_json(search_url, timeout=10)
+    if not isinstance(data, list):
+        return []
+    for match in data:
+        symbols.remember(match.get('symbol'), match.get('name'), match.get('exchangeShortName', ''))
+    return [match.get('symbol') for match in data if match.get('symbol')]
+
+def _light_financials(financials):
+    """Keep only the financial fields the search results list shows"""
+    light = {}
+    for field, source_field in SEARCH_RESULT_FIELDS.items():
+        value = financials.get(source_field)
+        if value is None:
+            value = financials.get(field)
+        light[field] = value
+    return light
+
+def _search_entities(query, deadline):
+    """Resolve candidates for a query and fetch their list-view financials"""
+    limit = getattr(settings, 'SCRAPER_SEARCH_LIMIT', 5)
+    
+    # Resolve candidates from every source concurrently
+    calls = {
+        "index": (symbols.search, query, limit),
+        "fmp": (_search_fmp_symbols, query, limit),
+    }
+    results, _ = run_with_deadline(calls, deadline)
+    candidates = [query] if looks_like_symbol(query) else []
+    candidates += results.get("index", []) + results.get("fmp", [])
+    candidates = list(dict.fromkeys(candidates))[:limit]
+    
+    # Quote and profile only; ratios, news and opinions wait for the detail page
+    financials = get_financial_data_bulk(candidates, deadline) if candidates else {}
+    return _build_search_entries(candidates, financials)
+
+def _search_local(query):
+    """Search the local symbol index and known financials only, without calling any provider"""
+    candidates = [query] if looks_like_symbol(query) else []
+    candidates += symbols.search(query, getattr(settings, 'SCRAPER_SEARCH_LIMIT', 5))
+    candidates = list(dict.fromkeys(candidates))
+    return _build_search_entries(candidates, load_financials(candidates) if candidates else {})
+
+def _build_search_entries(candidates, financials):
+    """Build the search results list for candidates that have financials"""
+    entries = []
+    for symbol in candidates:
+        data = financials.get(symbol)
+        if not data:
+            continue
+        entries.append({
+            "name": data.get('company_name') or symbols.lookup_name(symbol) or symbol,
+            "symbol": symbol,
+            "type": "company",
+            "financials": _light_financials(data),
+        })
+    return entries
+
+def search_entities(query, deadline=None):
+    """Search for companies matching a query, returning lightweight results
+
+    Candidates from the local symbol index and FMP's search endpoint are
+    resolved concurrently, and only the fields the search results list
+    shows are kept. The whole results page is cached under the normalized
+    query. Clients over their request budget only get cached results, or
+    matches from the local index.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'SCRAPER_ENTITY_DEADLINE', 12)
+    
+    normalized = ' '.join(query.split())
+    if not normalized:
+        return []
+    
+    # Not lowercased: an uppercase query is also tried as a ticker, so
+    # "AAPL" and "aapl" can have different results
+    key_hash = hashlib.md5(normalized.encode()).hexdigest()
+    if budget.cache_only():
+        return get_cached(f"search_results_{key_hash}") or _search_local(normalized)
+    
+    return cached_fetch(
+        f"search_results_{key_hash}",
+        lambda: _search_entities(normalized, deadline),
+        'search',
+        timeout=deadline,
+    )
 
-def scrape_google_news(entity_name):
-    """Scrape Google News for the entity"""
+def scrape_google_news(entity_name, page=1):
+    """Scrape Google News for the entity
+
+    New items are ingested incrementally and the page is served from the
+    stored history, so repeat views don't refetch or reparse the feed.
+    """
     try:
         encoded_name = quote_plus(entity_name)
         news_url = f"https://news.google.com/rss/search?q={encoded_name}"
-        response = requests.get(news_url, timeout=10)
-        soup = BeautifulSoup(response.content, 'xml')
-        
-        deals = []
-        for item in soup.find_all('item')[:5]:
-            title = item.title.text if item.title else ""
-            link = item.link.text if item.link else ""
-            date = item.pubDate.text if item.pubDate else ""
-            
-            # Clean up the title
-            title = re.sub(r' - [^-]+$', '', title)
-            
-            deals.append({
-                "title": title,
-                "link": link,
-                "date": date,
-                "source": "Google News"
-            })
-        return deals
+        ingest_feed("news", entity_name, news_url, _parse_google_news)
     except Exception as e:
         logger.error(f"Google News scraping error: {str(e)}")
+    
+    try:
+        return get_feed_page("news", entity_name, page, per_page=5)
+    except Exception as e:
+        logger.error(f"Error loading stored news for {entity_name}: {str(e)}")
         return []
 
-def scrape_reddit_opinions(entity_name):
-    """Scrape Reddit for opinions about the entity"""
+def scrape_reddit_opinions(entity_name, page=1):
+    """Scrape Reddit for opinions about the entity
+
+    Like scrape_google_news, only unseen posts are stored and the page is
+    served from the stored history.
+    """
     try:
         encoded_name = quote_plus(entity_name)
-        reddit_url = f"https://www.reddit.com/search.json?q={encoded_name}&limit=8"
+        reddit_url = f"https://www.reddit.com/search.json?q={encoded_name}&limit=25"
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(reddit_url, headers=headers, timeout=10)
-        data = response.json()
-        
-        opinions = []
-        posts = data.get('data', {}).get('children', [])
-        
-        for post in posts:
-            post_data = post.get('data', {})
-            title = post_data.get('title', '')
-            # Skip if it's just a stock symbol
-            if len(title.split()) <= 2 and any(char.isdigit() for char in title):
-                continue
-                
-            opinions.append({
-                "source": "Reddit",
-                "text": title,
-                "score": post_data.get('score', 0),
-                "url": f"https://reddit.com{post_data.get('permalink', '')}",
-                "date": datetime.fromtimestamp(post_data.get('created_utc', 0)).strftime('%Y-%m-%d'),
-                "subreddit": post_data.get('subreddit', '')
-            })
-        return opinions
+        ingest_feed("reddit", entity_name, reddit_url, _parse_reddit_opinions, headers=headers)
     except Exception as e:
         logger.error(f"Reddit scraping error: {str(e)}")
+    
+    try:
+        return get_feed_page("reddit", entity_name, page, per_page=8)
+    except Exception as e:
+        logger.error(f"Error loading stored opinions for {entity_name}: {str(e)}")
         return []
 
 def find_symbol_for_company(company_name):
     """Try to find stock symbol for a company name using Financial Modeling Prep"""
+    # Check the local symbol index first
+    symbol = symbols.lookup_symbol(company_name)
+    if symbol:
+        return symbol
+    
     try:
         if settings.FINANCIAL_MODELING_PREP_API_KEY:
             search_url = f"https://financialmodelingprep.com/api/v3/search?query={quote_plus(company_name)}&limit=5&apikey={settings.FINANCIAL_MODELING_PREP_API_KEY}"
-            response = requests.get(search_url, timeout=10)
-            data = response.json()
+            data = get_json(search_url, timeout=10)
             
             if data and isinstance(data, list) and len(data) > 0:
-                return data[0].get('symbol')
+                symbol = data[0].get('symbol')
+                symbols.remember(symbol, data[0].get('name'), data[0].get('exchangeShortName', ''))
+                return symbol
         
         # Fallback to Yahoo Finance search
         search_url = f"https://finance.yahoo.com/lookup?s={quote_plus(company_name)}"
@@ -400,23 +800,121 @@ def find_symbol_for_company(company_name):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(search_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
+        response = http_get(search_url, headers=headers, timeout=10)
+        found = extract_elements(response.text, YAHOO_LOOKUP_SPECS)
         
         # Look for the first result
-        first_result = soup.find('tr', {'class': 'react-data-row'})
-        if first_result:
-            symbol_cell = first_result.find('td', {'aria-label': 'Symbol'})
-            if symbol_cell:
-                return symbol_cell.text.strip()
+        symbol_cell = found.get('symbol_cell')
+        if symbol_cell and symbol_cell['text']:
+            symbol = symbol_cell['text']
+            # Only index the name Yahoo lists, never the user's query
+            name_cell = found.get('name_cell')
+            if name_cell and name_cell['text']:
+                symbols.remember(symbol, name_cell['text'])
+            return symbol
     
     except Exception as e:
         logger.error(f"Error finding symbol for company {company_name}: {str(e)}")
     
     return None
 
-def scrape_entity_info(entity_name, entity_type):
-    """Main function to scrape information about an entity"""
+def looks_like_symbol(entity_name):
+    """Check whether an entity name looks like a stock ticker"""
+    return (entity_name.isupper() and
+            len(entity_name) <= 5 and
+            not any(c in entity_name for c in ' ./-'))
+
+def get_entity_financials(entity_name):
+    """Resolve the symbol for an entity name and get its financial data"""
+    if looks_like_symbol(entity_name):
+        symbol = entity_name
+    else:
+        # Search for the symbol based on company name
+        symbol = find_symbol_for_company(entity_name)
+    
+    if not symbol:
+        return {}
+    return get_financial_data(symbol)
+
+def scrape_entity_info(entity_name, entity_type, deadline=None):
+    """Main function to scrape information about an entity
+
+    Financials, news and opinions are fetched concurrently and the whole
+    entity is bounded by ``deadline`` seconds (``SCRAPER_ENTITY_DEADLINE``).
+    Sources that miss the deadline are left out and flagged in
+    ``source_status`` instead of holding up the response. Results are
+    cached stale-while-revalidate, and concurrent requests for the same
+    entity share a single scrape. Clients over their request budget get
+    the cached or locally stored data instead of a scrape.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'SCRAPER_ENTITY_DEADLINE', 12)
+    
+    if budget.cache_only():
+        return get_cached(_entity_info_key(entity_name, entity_type)) or _get_local_entity_info(entity_name, entity_type)
+    
+    return cached_fetch(
+        _entity_info_key(entity_name, entity_type),
+        lambda: _scrape_entity_info(entity_name, entity_type, deadline),
+        'entity',
+        is_valid=_is_complete,
+        timeout=deadline,
+    )
+
+def _entity_info_key(entity_name, entity_type):
+    """Cache key for an entity's scraped info"""
+    key_hash = hashlib.md5(f"{entity_type}:{entity_name}".encode()).hexdigest()
+    return f"entity_info_{key_hash}"
+
+def _is_complete(data):
+    """Check that no source timed out or failed while scraping an entity"""
+    return all(status in ("ok", "empty") for status in data["source_status"].values())
+
+def refresh_financial_data(symbol):
+    """Refetch financial data for a symbol from the providers and update the cache"""
+    data = fetch_financial_data(symbol)
+    if _has_price(data):
+        set_cached(f"financial_data_{symbol}", data, 'quote')
+    return data
+
+def refresh_entity_info(entity_name, entity_type, deadline=None):
+    """Rescrape an entity, bypassing the cache, and store the result for page views"""
+    if deadline is None:
+        deadline = getattr(settings, 'SCRAPER_ENTITY_DEADLINE', 12)
+    
+    if entity_type == "company":
+        symbol = entity_name if looks_like_symbol(entity_name) else find_symbol_for_company(entity_name)
+        if symbol:
+            refresh_financial_data(symbol)
+    
+    data = _scrape_entity_info(entity_name, entity_type, deadline)
+    if _is_complete(data):
+        set_cached(_entity_info_key(entity_name, entity_type), data, 'entity')
+    return data
+
+def _get_search_name(entity_name, entity_type):
+    """Name an entity's news and opinions are searched, and stored, under"""
+    # News and opinions run alongside the financial chain, so they can't wait
+    # for the discovered company name. Use it when it is already cached.
+    if entity_type == "company" and looks_like_symbol(entity_name):
+        cached_data = get_cached(f"financial_data_{entity_name}")
+        if cached_data and cached_data.get('company_name'):
+            return cached_data['company_name']
+    return entity_name
+
+def _get_entity_calls(entity_name, entity_type):
+    """Build the independent source calls for an entity"""
+    search_name = _get_search_name(entity_name, entity_type)
+    calls = {
+        "deals": (scrape_google_news, search_name),
+        "opinions": (scrape_reddit_opinions, search_name),
+    }
+    if entity_type == "company":
+        calls["financials"] = (get_entity_financials, entity_name)
+    return calls
+
+def _build_entity_info(entity_name, entity_type, results, source_status):
+    """Assemble an entity's info from the results of its source calls"""
     data = {
         "name": entity_name,
         "type": entity_type,
@@ -424,43 +922,119 @@ def scrape_entity_info(entity_name, entity_type):
         "deals": [],
         "opinions": [],
         "last_updated": datetime.now().isoformat(),
-        "sources": []
+        "sources": [],
+        "source_status": source_status
     }
     
-    # Get financial data for companies
-    if entity_type == "company":
-        # Check if it looks like a stock symbol
-        if (entity_name.isupper() and 
-            len(entity_name) <= 5 and 
-            not any(c in entity_name for c in ' ./-')):
-            
-            financial_data = get_financial_data(entity_name)
-            if financial_data:
-                data["financials"] = financial_data
-                data["sources"].append(financial_data.get("source", "Financial Data"))
-                
-                # Use the discovered company name if available
-                if financial_data.get('company_name'):
-                    data["name"] = financial_data['company_name']
-        else:
-            # Search for the symbol based on company name
-            symbol = find_symbol_for_company(entity_name)
-            if symbol:
-                financial_data = get_financial_data(symbol)
-                if financial_data:
-                    data["financials"] = financial_data
-                    data["sources"].append(financial_data.get("source", "Financial Data"))
+    # Get financial data for companies; entity info is stored as JSON, so
+    # the record goes in as a plain dict
+    financial_data = results.get("financials")
+    if financial_data:
+        data["financials"] = dict(financial_data)
+        data["sources"].append(financial_data.get("source", "Financial Data"))
+        
+        # Use the discovered company name if available
+        if looks_like_symbol(entity_name) and financial_data.get('company_name'):
+            data["name"] = financial_data['company_name']
     
     # Get news/deals
-    news_data = scrape_google_news(data["name"])
-    if news_data:
-        data["deals"] = news_data
+    if results.get("deals"):
+        data["deals"] = results["deals"]
         data["sources"].append("Google News")
     
     # Get opinions
-    opinion_data = scrape_reddit_opinions(data["name"])
-    if opinion_data:
-        data["opinions"] = opinion_data
+    if results.get("opinions"):
+        data["opinions"] = results["opinions"]
         data["sources"].append("Reddit")
     
-    return data
\ No newline at end of file
+    data["fragment_versions"] = get_fragment_versions(data)
+    return data
+
+def _get_local_entity_info(entity_name, entity_type):
+    """Assemble an entity from cached financials and stored feed items, without calling any provider
+
+    Every source is marked "skipped", so the result is never cached as a
+    complete scrape.
+    """
+    results = {}
+    if entity_type == "company":
+        symbol = entity_name if looks_like_symbol(entity_name) else symbols.lookup_symbol(entity_name)
+        if symbol:
+            results["financials"] = load_financials([symbol]).get(symbol)
+    search_name = _get_search_name(entity_name, entity_type)
+    results["deals"] = get_feed_page("news", search_name, per_page=5)
+    results["opinions"] = get_feed_page("reddit", search_name, per_page=8)
+    
+    source_status = {section: "skipped" for section in _get_entity_calls(entity_name, entity_type)}
+    data = _build_entity_info(entity_name, entity_type, results, source_status)
+    data["cache_only"] = True
+    return data
+
+def _scrape_entity_info(entity_name, entity_type, deadline):
+    """Scrape an entity's sources concurrently within the deadline"""
+    results, source_status = run_with_deadline(_get_entity_calls(entity_name, entity_type), deadline)
+    return _build_entity_info(entity_name, entity_type, results, source_status)
+
+def iter_entity_sections(entity_name, entity_type, deadline=None):
+    """Yield an entity's sections as each source completes
+
+    Yields ``(section, status, result)`` for "financials", "deals" and
+    "opinions" in completion order, so callers can show the fastest source
+    first. A cached entity yields all of its sections immediately, as does
+    the locally stored data for clients over their request budget. The last
+    item is ``("done", "ok", data)`` with the assembled entity info, which is
+    cached the same way as scrape_entity_info's result. As there, stale
+    entries are refreshed in the background, and concurrent requests for an
+    entity share one scrape: a request arriving while it is being scraped
+    gets all of its sections once that scrape completes.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'SCRAPER_ENTITY_DEADLINE', 12)
+    
+    key = _entity_info_key(entity_name, entity_type)
+    entry = cache.get(key)
+    cached_data = unwrap(entry)
+    if cached_data:
+        # Stale entries are served as is and refreshed in the background,
+        # as in scrape_entity_info; cache-only clients don't refresh
+        if is_stale(entry) and not budget.cache_only():
+            metrics.inc('scraper_cache_lookups_total', kind='entity', result='stale')
+            revalidate(key, lambda: _scrape_entity_info(entity_name, entity_type, deadline), 'entity', _is_complete)
+        else:
+            metrics.inc('scraper_cache_lookups_total', kind='entity', result='fresh')
+        yield from _iter_all_sections(cached_data)
+        return
+    
+    if budget.cache_only():
+        data = _get_local_entity_info(entity_name, entity_type)
+        for section in data["source_status"]:
+            yield section, "skipped", data[section]
+        yield "done", "ok", data
+        return
+    
+    metrics.inc('scraper_cache_lookups_total', kind='entity', result='miss')
+    with claim_flight(key, timeout=deadline) as publish:
+        if publish is None:
+            # The entity is already being scraped, here or in another
+            # worker: wait for that scrape instead of starting another one
+            yield from _iter_all_sections(scrape_entity_info(entity_name, entity_type, deadline))
+            return
+        
+        results = {}
+        source_status = {}
+        for section, status, result in iter_with_deadline(_get_entity_calls(entity_name, entity_type), deadline):
+            source_status[section] = status
+            if result:
+                results[section] = result
+            yield section, status, result
+        
+        data = _build_entity_info(entity_name, entity_type, results, source_status)
+        set_cached(key, data, 'entity' if _is_complete(data) else 'negative')
+        publish(data)
+    yield "done", "ok", data
+
+def _iter_all_sections(data):
+    """Yield every section of assembled entity info at once, then the final "done" item"""
+    for section in ("financials", "deals", "opinions"):
+        yield section, data["source_status"].get(section, "empty"), data[section]
+    yield "done", "ok", data
\ No newline at end of file
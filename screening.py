@@ -0,0 +1,175 @@
+import math
+from array import array
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from .caching import is_stale, unwrap
+from .financials import NUMERIC_FIELDS, parse_number
+from .scraper_models import FinancialSnapshot
+from .snapshots import SNAPSHOT_FIELDS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Lookup suffixes accepted in screening filters, e.g. pe_ratio__lt=30
+SCREEN_OPERATORS = ('gt', 'gte', 'lt', 'lte', 'abs_gt', 'abs_lt')
+
+DEFAULT_SCREEN_FIELDS = (
+    'current_price', 'price_change_percentage', 'market_cap', 'pe_ratio', 'dividend_yield', 'volume',
+)
+
+# Symbols per snapshot query, keeping IN lists under database parameter limits
+SNAPSHOT_BATCH_SIZE = 500
+
+def parse_filters(params):
+    """Turn ``field__op=value`` pairs into (field, op, number) filters
+
+    Parameters without ``__`` (sort, limit, fields...) are skipped. An
+    unknown field or operator, or a non-numeric value, raises ValueError.
+    """
+    filters = []
+    for key, value in params.items():
+        field, separator, op = key.partition('__')
+        if not separator:
+            continue
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"Unknown field in {key}: {field}")
+        if op not in SCREEN_OPERATORS:
+            raise ValueError(f"Unknown operator in {key}: {op}")
+        number = parse_number(value)
+        if number is None:
+            raise ValueError(f"Invalid value for {key}: {value}")
+        filters.append((field, op, number))
+    return filters
+
+def _load_latest_snapshots(symbols):
+    """Newest raw snapshot values per symbol, keyed by financial field"""
+    latest = (
+        FinancialSnapshot.objects.filter(symbol=OuterRef('symbol'), resolution='raw')
+        .order_by('-captured_at').values('id')[:1]
+    )
+    results = {}
+    for i in range(0, len(symbols), SNAPSHOT_BATCH_SIZE):
+        rows = FinancialSnapshot.objects.filter(
+            symbol__in=symbols[i:i + SNAPSHOT_BATCH_SIZE], resolution='raw', id=Subquery(latest),
+        ).values('symbol', *SNAPSHOT_FIELDS)
+        for row in rows:
+            results[row['symbol']] = {key: row[column] for column, key in SNAPSHOT_FIELDS.items()}
+    return results
+
+def load_cached_financials(symbols):
+    """Cached financials for many symbols, in two cache round-trips
+
+    Each symbol's ``financial_data`` entry is preferred over its batched
+    ``financial_summary``. Returns ``(results, stale)``: the data of the
+    symbols found, and those of them whose entry is past its soft TTL.
+    """
+    cached = cache.get_many([f"financial_data_{s}" for s in symbols])
+    cached.update(cache.get_many([f"financial_summary_{s}" for s in symbols]))
+    results, stale = {}, []
+    for symbol in symbols:
+        for key in (f"financial_data_{symbol}", f"financial_summary_{symbol}"):
+            data = unwrap(cached.get(key))
+            if data:
+                results[symbol] = data
+                if is_stale(cached[key]):
+                    stale.append(symbol)
+                break
+    return results, stale
+
+def load_financials(symbols, revalidate=None):
+    """Latest known financials for many symbols without waiting on any provider
+
+    Reads the cached entries and falls back to each remaining symbol's
+    newest snapshot. Symbols with neither are left out. Stale cached
+    symbols are passed to ``revalidate``, when given, to be refreshed in
+    the background.
+    """
+    results, stale = load_cached_financials(symbols)
+    if stale and revalidate is not None:
+        revalidate(stale)
+
+    missing = [s for s in symbols if s not in results]
+    if missing:
+        results.update(_load_latest_snapshots(missing))
+    return results
+
+def build_columns(symbols, financials, fields):
+    """Lay the financials out as one float column per field, NaN where missing"""
+    columns = {}
+    for field in fields:
+        values = []
+        for symbol in symbols:
+            value = parse_number((financials.get(symbol) or {}).get(field))
+            values.append(math.nan if value is None else value)
+        columns[field] = np.array(values, dtype=float) if np is not None else array('d', values)
+    return columns
+
+def _matches(column, op, value):
+    """Boolean mask of rows passing one filter; NaN never passes"""
+    if np is not None:
+        with np.errstate(invalid='ignore'):
+            if op.startswith('abs_'):
+                column, op = np.abs(column), op[4:]
+            return {
+                'gt': column > value, 'gte': column >= value,
+                'lt': column < value, 'lte': column <= value,
+            }[op]
+
+    compare = {
+        'gt': lambda x: x > value, 'gte': lambda x: x >= value,
+        'lt': lambda x: x < value, 'lte': lambda x: x <= value,
+    }[op.replace('abs_', '')]
+    if op.startswith('abs_'):
+        return [compare(abs(x)) for x in column]
+    return [compare(x) for x in column]
+
+def _ranked_rows(columns, count, filters, sort, descending):
+    """Indices of the rows passing every filter, ordered by the sort column with NaN last"""
+    if np is not None:
+        mask = np.ones(count, dtype=bool)
+        for field, op, value in filters:
+            mask &= _matches(columns[field], op, value)
+        rows = np.flatnonzero(mask)
+        if sort:
+            keys = columns[sort][rows]
+            order = np.argsort(-keys if descending else keys, kind='stable')
+            rows = rows[order]
+        return rows.tolist()
+
+    mask = [True] * count
+    for field, op, value in filters:
+        mask = [m and passed for m, passed in zip(mask, _matches(columns[field], op, value))]
+    rows = [i for i in range(count) if mask[i]]
+    if sort:
+        column = columns[sort]
+        rows.sort(key=lambda i: (math.isnan(column[i]), -column[i] if descending else column[i]))
+    return rows
+
+def screen(symbols, filters=(), sort=None, descending=False, limit=None, fields=DEFAULT_SCREEN_FIELDS,
+           revalidate=None):
+    """Filter and rank symbols on their latest known financials
+
+    ``filters`` are (field, op, value) tuples as returned by parse_filters;
+    ``sort`` is a numeric field. Filtering and sorting run over columns,
+    vectorized with NumPy when it is installed. Returns one dict per
+    matching symbol with ``symbol`` and the requested fields (None where
+    unknown), best first. ``revalidate`` is passed on to load_financials.
+    """
+    symbols = list(dict.fromkeys(s for s in symbols if s))
+    fields = list(dict.fromkeys(list(fields) + [f for f, _, _ in filters] + ([sort] if sort else [])))
+    columns = build_columns(symbols, load_financials(symbols, revalidate), fields)
+
+    rows = _ranked_rows(columns, len(symbols), filters, sort, descending)
+    if limit is not None:
+        rows = rows[:limit]
+
+    results = []
+    for i in rows:
+        result = {'symbol': symbols[i]}
+        for field in fields:
+            value = columns[field][i]
+            result[field] = None if math.isnan(value) else float(value)
+        results.append(result)
+    return results
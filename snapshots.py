@@ -0,0 +1,143 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .scraper_models import FinancialSnapshot
+from .financials import parse_number
+
+logger = logging.getLogger(__name__)
+
+# Financial dict key for each numeric snapshot column
+SNAPSHOT_FIELDS = {
+    'price': 'current_price',
+    'price_change_percentage': 'price_change_percentage',
+    'day_high': 'day_high',
+    'day_low': 'day_low',
+    'volume': 'volume',
+    'market_cap': 'market_cap',
+    'pe_ratio': 'pe_ratio',
+    'eps': 'eps',
+    'dividend_yield': 'dividend_yield',
+}
+
+# resolution: (age before it is rolled up or dropped, resolution it rolls into)
+DEFAULT_SNAPSHOT_RETENTION = {
+    'raw': (timedelta(days=2), 'hour'),
+    'hour': (timedelta(days=30), 'day'),
+    'day': (timedelta(days=5 * 365), None),
+}
+
+# How each column is aggregated into a coarser bucket
+ROLLUP_AGGREGATES = {
+    'price': Avg('price'),
+    'price_change_percentage': Avg('price_change_percentage'),
+    'day_high': Max('day_high'),
+    'day_low': Min('day_low'),
+    'volume': Max('volume'),
+    'market_cap': Avg('market_cap'),
+    'pe_ratio': Avg('pe_ratio'),
+    'eps': Avg('eps'),
+    'dividend_yield': Avg('dividend_yield'),
+}
+
+def build_snapshot(symbol, financials, captured_at=None):
+    """Turn a financial data dict into an unsaved raw snapshot"""
+    values = {column: parse_number(financials.get(key)) for column, key in SNAPSHOT_FIELDS.items()}
+    if values['volume'] is not None:
+        values['volume'] = int(values['volume'])
+    return FinancialSnapshot(symbol=symbol, captured_at=captured_at or timezone.now(), **values)
+
+def record_snapshots(items):
+    """Append raw snapshots for (symbol, financials) pairs in one bulk insert
+
+    Pairs without a numeric price are skipped. Returns the number of rows
+    written; failures are logged rather than raised so a snapshot never
+    breaks a scrape.
+    """
+    now = timezone.now()
+    rows = [build_snapshot(symbol, financials, now) for symbol, financials in items]
+    rows = [row for row in rows if row.price is not None]
+    if not rows:
+        return 0
+    try:
+        FinancialSnapshot.objects.bulk_create(rows, batch_size=1000)
+    except Exception as e:
+        logger.error(f"Error recording {len(rows)} financial snapshots: {str(e)}")
+        return 0
+    return len(rows)
+
+def get_history(symbol, start, end=None, resolution='raw'):
+    """Return a symbol's snapshots at one resolution within a time window, oldest first"""
+    history = FinancialSnapshot.objects.filter(symbol=symbol, resolution=resolution, captured_at__gte=start)
+    if end is not None:
+        history = history.filter(captured_at__lt=end)
+    return history.order_by('captured_at')
+
+def get_price_change(symbol, since):
+    """Percentage price change from the first snapshot after ``since`` to the latest one"""
+    history = FinancialSnapshot.objects.filter(symbol=symbol, resolution='raw', captured_at__gte=since)
+    first = history.order_by('captured_at').values_list('price', flat=True).first()
+    last = history.order_by('-captured_at').values_list('price', flat=True).first()
+    if not first or last is None:
+        return None
+    return (last - first) / first * 100
+
+def _bucket_start(moment, resolution):
+    """Start of the hour or day containing moment, in the time zone Trunc buckets by"""
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+def rollup(source, target, cutoff):
+    """Aggregate ``source`` snapshots older than cutoff into ``target`` buckets
+
+    The cutoff is moved back to the start of its bucket, so only whole
+    buckets are rolled up and each gets exactly one row; the rest of the
+    current bucket waits for a later run. The rolled-up rows replace the
+    originals in one transaction.
+    """
+    cutoff = _bucket_start(cutoff, target)
+    old_rows = FinancialSnapshot.objects.filter(resolution=source, captured_at__lt=cutoff)
+    with transaction.atomic():
+        buckets = (
+            old_rows.annotate(bucket=Trunc('captured_at', target))
+            .values('symbol', 'bucket')
+            .annotate(**ROLLUP_AGGREGATES)
+        )
+        rows = [
+            FinancialSnapshot(
+                symbol=bucket['symbol'],
+                captured_at=bucket['bucket'],
+                resolution=target,
+                **{column: bucket[column] for column in ROLLUP_AGGREGATES},
+            )
+            for bucket in buckets
+        ]
+        for row in rows:
+            if row.volume is not None:
+                row.volume = int(row.volume)
+        FinancialSnapshot.objects.bulk_create(rows, batch_size=1000)
+        old_rows.delete()
+    return len(rows)
+
+def apply_retention():
+    """Roll raw snapshots into hourly and hourly into daily, and drop expired daily rows
+
+    Ages come from SNAPSHOT_RETENTION, which overrides the defaults per
+    resolution.
+    """
+    retention = dict(DEFAULT_SNAPSHOT_RETENTION, **getattr(settings, 'SNAPSHOT_RETENTION', {}))
+    now = timezone.now()
+    for resolution in ('raw', 'hour', 'day'):
+        max_age, target = retention[resolution]
+        cutoff = now - max_age
+        if target:
+            rollup(resolution, target, cutoff)
+        else:
+            FinancialSnapshot.objects.filter(resolution=resolution, captured_at__lt=cutoff).delete()
@@ -0,0 +1,146 @@
+import csv
+import re
+import time
+import bisect
+import threading
+import logging
+from django.conf import settings
+from .scraper_models import CompanySymbol
+
+logger = logging.getLogger(__name__)
+
+# Legal-form suffixes dropped when normalizing company names
+NAME_SUFFIXES = {
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'ltd',
+    'limited', 'plc', 'llc', 'lp', 'holdings', 'group', 'sa', 'ag', 'nv', 'se',
+}
+
+_lock = threading.Lock()
+# (normalized name -> symbol, symbol -> name, sorted normalized names).
+# A reload builds a new tuple and swaps it in whole, so readers holding
+# the old one never see it half updated.
+_index = ({}, {}, [])
+_loaded_at = None
+
+def normalize_name(name):
+    """Normalize a company name for matching: lowercase, no punctuation or legal suffixes"""
+    words = re.sub(r'[^a-z0-9 ]+', ' ', name.lower()).split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    if words and words[0] == 'the' and len(words) > 1:
+        words.pop(0)
+    return ' '.join(words)
+
+def _add_to_memory(symbol, name):
+    """Add a mapping to the in-memory index, keeping the first symbol seen for a name"""
+    by_name, by_symbol, sorted_names = _index
+    normalized = normalize_name(name)
+    by_symbol[symbol] = name
+    if normalized and normalized not in by_name:
+        # Named before it is listed, so readers never find a name without its symbol
+        by_name[normalized] = symbol
+        bisect.insort(sorted_names, normalized)
+
+def _ensure_loaded():
+    """Load the index from the database on first use and periodically after that"""
+    global _index, _loaded_at
+    reload_after = getattr(settings, 'SCRAPER_SYMBOL_INDEX_RELOAD', 3600)
+    if _loaded_at is not None and time.time() - _loaded_at < reload_after:
+        return
+
+    with _lock:
+        if _loaded_at is not None and time.time() - _loaded_at < reload_after:
+            return
+        by_name = {}
+        by_symbol = {}
+        for symbol, name, normalized in CompanySymbol.objects.values_list('symbol', 'name', 'normalized_name').iterator():
+            by_symbol[symbol] = name
+            by_name.setdefault(normalized, symbol)
+        _index = (by_name, by_symbol, sorted(by_name))
+        _loaded_at = time.time()
+
+def lookup_symbol(company_name):
+    """Resolve a company name to a symbol from the local index, or None
+
+    Only exact normalized matches count: a prefix would resolve to
+    whichever indexed name sorts first ("Meta" -> "Meta Materials").
+    """
+    normalized = normalize_name(company_name)
+    if not normalized:
+        return None
+
+    _ensure_loaded()
+    return _index[0].get(normalized)
+
+def search(query, limit=5):
+    """Return up to ``limit`` indexed symbols whose normalized name matches or starts with the query"""
+    normalized = normalize_name(query)
+    if not normalized:
+        return []
+
+    _ensure_loaded()
+    by_name, _, sorted_names = _index
+    results = []
+    if normalized in by_name:
+        results.append(by_name[normalized])
+    i = bisect.bisect_left(sorted_names, normalized)
+    while len(results) < limit and i < len(sorted_names) and sorted_names[i].startswith(normalized):
+        symbol = by_name[sorted_names[i]]
+        if symbol not in results:
+            results.append(symbol)
+        i += 1
+    return results
+
+def lookup_name(symbol):
+    """Return the indexed company name for a symbol, or None"""
+    _ensure_loaded()
+    return _index[1].get(symbol)
+
+def remember(symbol, name, exchange=''):
+    """Record a successful name/symbol resolution in memory and the database"""
+    if not symbol or not name or _index[1].get(symbol) == name:
+        return
+
+    with _lock:
+        _add_to_memory(symbol, name)
+    try:
+        CompanySymbol.objects.update_or_create(
+            symbol=symbol,
+            defaults={'name': name, 'normalized_name': normalize_name(name), 'exchange': exchange or ''},
+        )
+    except Exception as e:
+        logger.error(f"Error saving symbol {symbol} to index: {str(e)}")
+
+def preload_listing(path, batch_size=1000):
+    """Bulk load a listing CSV with symbol and name (and optional exchange) columns
+
+    Column headers are matched case-insensitively, so exchange listing
+    files such as NASDAQ's can be loaded as downloaded. Returns the number
+    of rows loaded.
+    """
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+            symbol = row.get('symbol')
+            name = row.get('name') or row.get('company name') or row.get('security name')
+            if symbol and name:
+                rows.append(CompanySymbol(
+                    symbol=symbol,
+                    name=name,
+                    normalized_name=normalize_name(name),
+                    exchange=row.get('exchange', ''),
+                ))
+
+    CompanySymbol.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['symbol'],
+        update_fields=['name', 'normalized_name', 'exchange'],
+    )
+
+    with _lock:
+        for row in rows:
+            _add_to_memory(row.symbol, row.name)
+    return len(rows)
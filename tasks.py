@@ -0,0 +1,76 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from core.models import EntityData
+from core.scrapers import get_financial_data_bulk, refresh_entity_info
+from .alert_engine import evaluate_snapshot, send_digests
+from core.snapshots import apply_retention
+
+logger = logging.getLogger(__name__)
+
+def get_entities_to_refresh():
+    """Return (id, name, entity_type) for every saved or recently searched entity, once each"""
+    since = timezone.now() - timedelta(days=getattr(settings, 'SCRAPER_REFRESH_RECENT_DAYS', 7))
+    return list(
+        EntityData.objects.filter(
+            Q(savedentity__isnull=False) | Q(searchhistory__search_date__gte=since)
+        ).distinct().values_list('id', 'name', 'entity_type')
+    )
+
+@shared_task
+def refresh_saved_entities():
+    """Queue a refresh for every saved or recently searched entity
+
+    Meant to run from celery beat every SCRAPER_REFRESH_INTERVAL seconds.
+    Entities are deduplicated across users and their refreshes are spread
+    evenly over the interval so upstream providers never see a burst.
+    """
+    interval = getattr(settings, 'SCRAPER_REFRESH_INTERVAL', 600)
+    entities = get_entities_to_refresh()
+    if not entities:
+        return 0
+
+    spacing = interval / len(entities)
+    # Shorter than the interval, so the marker is gone by the next regular
+    # beat even when that beat fires a little early
+    queued_ttl = interval // 2
+    queued = 0
+    for i, (entity_id, name, entity_type) in enumerate(entities):
+        # Skip entities already queued this interval, e.g. by an overlapping beat
+        if not cache.add(f"refresh_queued_{entity_id}", 1, queued_ttl):
+            continue
+        refresh_entity.apply_async(args=[entity_id, name, entity_type], countdown=i * spacing)
+        queued += 1
+    return queued
+
+@shared_task
+def refresh_entity(entity_id, name, entity_type):
+    """Rescrape one entity into the cache, store it and raise alerts for what changed"""
+    try:
+        data = refresh_entity_info(name, entity_type)
+    except Exception as e:
+        logger.error(f"Error refreshing entity {name}: {str(e)}")
+        return False
+
+    EntityData.objects.filter(id=entity_id).update(data=data)
+    evaluate_snapshot(entity_id, data)
+    return True
+
+@shared_task
+def prefetch_financials(symbols):
+    """Warm the financial data cache for a batch of symbols, e.g. after a watchlist import"""
+    return len(get_financial_data_bulk(symbols))
+
+@shared_task
+def send_alert_digests(frequency):
+    """Send the 'daily' or 'weekly' alert digests; schedule once per period from celery beat"""
+    return send_digests(frequency)
+
+@shared_task
+def roll_up_snapshots():
+    """Downsample and expire financial snapshots; schedule hourly from celery beat"""
+    apply_retention()
@@ -1,3 +1,707 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from core import benchmarks, budget, caching, ingest, metrics, provider_health, scrapers, screening, symbols
+from core.caching import cached_fetch, set_cached, single_flight
+from core.financials import parse_number, parse_range
+from core.html_extract import ElementExtractor, extract_elements
+from core.models import EntityData
+from core.provider_health import ProviderUnavailable
+from core.scraper_models import CompanySymbol, FeedItem, FeedState, FinancialSnapshot
+from core.snapshots import rollup
+from core.templatetags.financial_filters import abbreviate
+from . import views, watchlist
+from .alert_engine import diff_snapshot
+from .models import AlertState, SavedEntity
 
-# Create your tests here.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CachedFetchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(caching, '_get_refresh_executor', return_value=InlineExecutor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_miss_fetches_and_caches(self):
+        fetch = mock.Mock(return_value={'price': 1})
+        self.assertEqual(cached_fetch('k', fetch, 'quote'), {'price': 1})
+        self.assertEqual(cached_fetch('k', fetch, 'quote'), {'price': 1})
+        fetch.assert_called_once()
+
+    def test_stale_entry_is_served_then_refreshed(self):
+        set_cached('k', 'old', 'quote')
+        entry = cache.get('k')
+        entry['soft_expires'] = time.time() - 1
+        cache.set('k', entry)
+        self.assertEqual(cached_fetch('k', lambda: 'new', 'quote'), 'old')
+        self.assertEqual(cached_fetch('k', lambda: 'newer', 'quote'), 'new')
+
+    def test_invalid_results_are_cached_negatively(self):
+        cached_fetch('k', lambda: None, 'quote')
+        entry = cache.get('k')
+        self.assertIsNone(entry['value'])
+        self.assertLessEqual(entry['soft_expires'], time.time() + caching.get_ttls('negative')[0])
+
+    def test_entries_without_soft_expiry_are_misses(self):
+        cache.set('k', {'price': 1})
+        self.assertIsNone(caching.get_cached('k'))
+        self.assertEqual(cached_fetch('k', lambda: {'price': 2}, 'quote'), {'price': 2})
+        self.assertEqual(caching.get_cached('k'), {'price': 2})
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_coalesces_concurrent_calls(self):
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight('k', fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_runs_again_after_a_failure(self):
+        with self.assertRaises(RuntimeError):
+            single_flight('k', mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(single_flight('k', lambda: 'value'), 'value')
+
+# Reload on every lookup, as if another worker had just written the rows
+@override_settings(SCRAPER_SYMBOL_INDEX_RELOAD=0)
+class SymbolIndexTests(TestCase):
+    def add(self, symbol, name):
+        CompanySymbol.objects.create(symbol=symbol, name=name, normalized_name=symbols.normalize_name(name))
+
+    def test_normalize_name(self):
+        self.assertEqual(symbols.normalize_name("The Apple Inc."), 'apple')
+        self.assertEqual(symbols.normalize_name("Coca-Cola Co"), 'coca cola')
+        self.assertEqual(symbols.normalize_name("Group"), 'group')
+        self.assertEqual(symbols.normalize_name("..."), '')
+
+    def test_lookups(self):
+        self.add('AAPL', 'Apple Inc.')
+        self.assertEqual(symbols.lookup_symbol('apple, inc'), 'AAPL')
+        self.assertEqual(symbols.lookup_name('AAPL'), 'Apple Inc.')
+        self.assertIsNone(symbols.lookup_symbol('Banana'))
+        self.assertIsNone(symbols.lookup_symbol(''))
+
+    def test_lookup_matches_whole_names_only(self):
+        self.add('MMAT', 'Meta Materials Inc.')
+        self.assertIsNone(symbols.lookup_symbol('Meta'))
+        self.assertEqual(symbols.lookup_symbol('Meta Materials'), 'MMAT')
+
+    def test_reload_picks_up_rows_from_other_workers(self):
+        self.assertIsNone(symbols.lookup_symbol('nvidia'))
+        self.add('NVDA', 'NVIDIA Corporation')
+        self.assertEqual(symbols.lookup_symbol('nvidia'), 'NVDA')
+        CompanySymbol.objects.filter(symbol='NVDA').delete()
+        self.assertIsNone(symbols.lookup_symbol('nvidia'))
+
+    def test_remember_persists(self):
+        symbols.remember('MSFT', 'Microsoft Corporation', 'NASDAQ')
+        row = CompanySymbol.objects.get(symbol='MSFT')
+        self.assertEqual((row.normalized_name, row.exchange), ('microsoft', 'NASDAQ'))
+        self.assertEqual(symbols.lookup_symbol('Microsoft'), 'MSFT')
+
+    def test_preload_listing(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("Symbol,Company Name,Exchange\nAAPL,Apple Inc.,NASDAQ\nKO,The Coca-Cola Company,NYSE\n,No symbol,NYSE\n")
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(symbols.preload_listing(f.name), 2)
+        self.assertEqual(symbols.lookup_symbol('coca cola'), 'KO')
+        self.assertEqual(CompanySymbol.objects.get(symbol='AAPL').exchange, 'NASDAQ')
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    SCRAPER_PROVIDER_LIMITS={'api.example.com': (3, 60)},
+    SCRAPER_BREAKER_THRESHOLD=2,
+)
+class ProviderHealthTests(SimpleTestCase):
+    HOST = 'api.example.com'
+
+    def setUp(self):
+        cache.clear()
+
+    def open_breaker(self):
+        provider_health.record_failure(self.HOST)
+        provider_health.record_failure(self.HOST)
+        with self.assertRaises(ProviderUnavailable):
+            provider_health.before_request(self.HOST)
+        # The cooldown is over
+        cache.delete(f"health:{self.HOST}:open")
+
+    def test_rate_window(self):
+        with mock.patch.object(provider_health.time, 'time', return_value=125.0):
+            for _ in range(3):
+                provider_health.before_request(self.HOST)
+            with self.assertRaises(ProviderUnavailable):
+                provider_health.before_request(self.HOST)
+            # Hosts without a quota are never limited
+            for _ in range(10):
+                provider_health.before_request('other.example.com')
+        with mock.patch.object(provider_health.time, 'time', return_value=185.0):
+            provider_health.before_request(self.HOST)
+
+    def test_breaker_lets_one_probe_through_and_closes_on_success(self):
+        self.open_breaker()
+        provider_health.before_request(self.HOST)
+        with self.assertRaises(ProviderUnavailable):
+            provider_health.before_request(self.HOST)
+        provider_health.record_success(self.HOST, 0.5)
+        provider_health.before_request(self.HOST)
+        provider_health.before_request(self.HOST)
+
+    def test_failed_probe_reopens_breaker(self):
+        self.open_breaker()
+        provider_health.before_request(self.HOST)
+        provider_health.record_failure(self.HOST)
+        with self.assertRaises(ProviderUnavailable):
+            provider_health.before_request(self.HOST)
+
+    def test_failures_below_threshold_keep_breaker_closed(self):
+        provider_health.record_failure(self.HOST)
+        provider_health.before_request(self.HOST)
+
+    def test_adaptive_timeout(self):
+        self.assertEqual(provider_health.get_timeout(self.HOST, 10), 10)
+        provider_health.record_success(self.HOST, 1.0)
+        self.assertEqual(provider_health.get_timeout(self.HOST, 10), 4.0)
+        provider_health.record_success('fast.example.com', 0.1)
+        self.assertEqual(provider_health.get_timeout('fast.example.com', 10), 2)
+
+@override_settings(PRICE_ALERT_THRESHOLD=5)
+class DiffSnapshotTests(SimpleTestCase):
+    def test_price_alert_when_first_crossing_threshold(self):
+        data = {'name': 'Apple', 'financials': {'price_change_percentage': -6.25}}
+        self.assertEqual(
+            diff_snapshot(AlertState(price_change_percentage=1), data),
+            [('price', "Apple is down 6.25% today")],
+        )
+        self.assertEqual(diff_snapshot(AlertState(price_change_percentage=5.5), data), [])
+        self.assertEqual(len(diff_snapshot(AlertState(), data)), 1)
+
+    def test_only_unseen_deals_and_opinions(self):
+        state = AlertState(deal_links=['a'], opinion_urls=['x'])
+        data = {
+            'name': 'Apple',
+            'deals': [{'link': 'a', 'title': 'Old'}, {'link': 'b', 'title': 'New'}, {'title': 'No link'}],
+            'opinions': [{'url': 'x', 'text': 'Old'}, {'url': 'y', 'text': 'New'}],
+        }
+        self.assertEqual(diff_snapshot(state, data), [
+            ('deal', "New in the news for Apple: New"),
+            ('review', "New discussion about Apple: New"),
+        ])
+
+class ElementExtractorTests(SimpleTestCase):
+    HTML = (
+        '<div class="quote main"><span>Price</span> <b>189.84</b></div>'
+        '<td data-test="PE_RATIO-value">29.5</td>'
+        '<img class="logo" src="/a.png"/>'
+        '<td data-test="PE_RATIO-value">ignored</td>'
+    )
+    SPECS = {
+        'quote': {'tag': 'div', 'class': 'main'},
+        'pe': {'data-test': 'PE_RATIO-value'},
+        'logo': {'tag': 'img', 'class': 'logo'},
+        'missing': {'tag': 'table'},
+    }
+
+    def test_first_match_per_spec(self):
+        found = extract_elements(self.HTML, self.SPECS)
+        self.assertEqual(found['quote']['text'], 'Price 189.84')
+        self.assertEqual(found['pe']['text'], '29.5')
+        self.assertEqual(found['logo'], {'attrs': {'class': 'logo', 'src': '/a.png'}, 'text': ''})
+        self.assertNotIn('missing', found)
+
+    def test_void_elements_without_a_slash(self):
+        parser = ElementExtractor({'quantity': {'data-test': 'A'}, 'text': {'tag': 'div'}})
+        parser.feed('<input data-test="A" value="3"><div>lots of text</div>')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.results, {
+            'quantity': {'attrs': {'data-test': 'A', 'value': '3'}, 'text': ''},
+            'text': {'attrs': {}, 'text': 'lots of text'},
+        })
+
+    def test_chunked_input(self):
+        self.assertEqual(
+            extract_elements(self.HTML, self.SPECS, chunk_size=7),
+            extract_elements(self.HTML, self.SPECS),
+        )
+
+    def test_nested_tags_and_early_stop(self):
+        parser = ElementExtractor({'outer': {'tag': 'div', 'id': 'a'}})
+        parser.feed('<div id="a">x<div>y</div>z</div>')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.results['outer']['text'], 'xyz')
+
+    def test_unclosed_element_keeps_text(self):
+        found = extract_elements('<p id="note">unfinished', {'note': {'tag': 'p', 'id': 'note'}})
+        self.assertEqual(found['note']['text'], 'unfinished')
+
+@override_settings(TIME_ZONE='UTC')
+class RollupTests(TestCase):
+    START = datetime(2024, 1, 2, 10, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        # One snapshot every 10 minutes from 10:00 to 11:50
+        FinancialSnapshot.objects.bulk_create([
+            FinancialSnapshot(symbol='AAPL', captured_at=self.START + timedelta(minutes=10 * i), price=i, day_high=i)
+            for i in range(12)
+        ])
+
+    def test_only_whole_buckets_are_rolled_up(self):
+        self.assertEqual(rollup('raw', 'hour', self.START + timedelta(minutes=35)), 0)
+        self.assertEqual(rollup('raw', 'hour', self.START + timedelta(minutes=95)), 1)
+        self.assertEqual(rollup('raw', 'hour', self.START + timedelta(minutes=115)), 0)
+        self.assertEqual(rollup('raw', 'hour', self.START + timedelta(hours=2)), 1)
+
+        hours = FinancialSnapshot.objects.filter(resolution='hour').order_by('captured_at')
+        self.assertEqual(
+            [(row.captured_at, row.price, row.day_high) for row in hours],
+            [(self.START, 2.5, 5), (self.START + timedelta(hours=1), 8.5, 11)],
+        )
+        self.assertFalse(FinancialSnapshot.objects.filter(resolution='raw').exists())
+
+    def test_hours_roll_into_days(self):
+        rollup('raw', 'hour', self.START + timedelta(hours=2))
+        self.assertEqual(
+            list(FinancialSnapshot.objects.filter(resolution='hour').order_by('captured_at').values_list('price', 'day_high')),
+            [(2.5, 5), (8.5, 11)],
+        )
+        self.assertEqual(rollup('hour', 'day', self.START + timedelta(days=1)), 1)
+        day = FinancialSnapshot.objects.get(resolution='day')
+        self.assertEqual(day.captured_at, datetime(2024, 1, 2, tzinfo=dt_timezone.utc))
+        self.assertEqual(day.price, 5.5)
+        self.assertEqual(day.day_high, 11)
+
+@override_settings(SCRAPER_FEED_MIN_INTERVAL=300)
+class IngestFeedTests(TestCase):
+    URL = 'https://feeds.example.com/apple'
+
+    def setUp(self):
+        patcher = mock.patch.object(ingest, 'http_get')
+        self.http_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, status_code=200, etag='"v1"'):
+        self.http_get.return_value = mock.Mock(status_code=status_code, headers={'ETag': etag})
+
+    def ingest(self, *keys):
+        parse = mock.Mock(return_value=[
+            (key, datetime(2024, 1, i + 1, tzinfo=dt_timezone.utc), {'title': key}) for i, key in enumerate(keys)
+        ])
+        return ingest.ingest_feed('news', 'Apple  Inc', self.URL, parse), parse
+
+    def make_due(self):
+        FeedState.objects.update(fetched_at=F('fetched_at') - timedelta(minutes=10))
+
+    def test_only_unseen_items_are_stored(self):
+        self.respond()
+        self.assertEqual(self.ingest('a', 'b')[0], 2)
+        self.make_due()
+        self.assertEqual(self.ingest('a', 'b', 'c')[0], 1)
+        self.assertEqual(self.http_get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(FeedItem.objects.filter(feed_key='apple inc').count(), 3)
+        self.assertEqual(
+            ingest.get_feed_page('news', 'apple inc', per_page=2),
+            [{'title': 'c'}, {'title': 'b'}],
+        )
+
+    def test_not_modified_feed_is_not_parsed(self):
+        self.respond()
+        self.ingest('a')
+        self.make_due()
+        self.respond(status_code=304)
+        count, parse = self.ingest('a', 'b')
+        self.assertEqual(count, 0)
+        parse.assert_not_called()
+        self.assertEqual(FeedItem.objects.count(), 1)
+        self.assertEqual(FeedState.objects.get().etag, '"v1"')
+
+    def test_recently_fetched_feed_is_not_requested(self):
+        self.respond()
+        self.ingest('a')
+        self.assertEqual(self.ingest('b')[0], 0)
+        self.http_get.assert_called_once()
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class EntityStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('reader', password='secret'))
+        EntityData.objects.create(name='AAPL', entity_type='company', data={})
+        self.url = reverse('entity_stream', kwargs={'entity_name': 'AAPL'})
+
+    def test_sections_are_sent_as_they_complete(self):
+        opinions = [{'source': 'Reddit', 'text': 'Strong quarter', 'url': 'https://example.com/1', 'score': 3}]
+        data = {'name': 'AAPL', 'financials': {}, 'deals': [], 'opinions': opinions, 'sources': ['Reddit']}
+        sections = [('opinions', 'ok', opinions), ('deals', 'empty', None), ('done', 'ok', data)]
+        with mock.patch.object(views, 'iter_entity_sections', return_value=iter(sections)):
+            response = self.client.get(self.url)
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['opinions', 'deals', 'financials', 'sources', 'done'])
+        self.assertIn('Strong quarter', body)
+        self.assertIn('Reddit', body.split('event: sources')[1])
+
+    def test_unknown_entity(self):
+        response = self.client.get(reverse('entity_stream', kwargs={'entity_name': 'NOPE'}))
+        self.assertEqual(response.status_code, 404)
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class IterEntitySectionsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.news = mock.Mock(return_value=[{'title': 'Launch', 'link': 'https://example.com/1'}])
+        self.reddit = mock.Mock(return_value=[])
+        for name, value in (('scrape_google_news', self.news), ('scrape_reddit_opinions', self.reddit)):
+            patcher = mock.patch.object(scrapers, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stale_entry_is_served_then_refreshed(self):
+        key = scrapers._entity_info_key('Widget', 'product')
+        old = {'name': 'Widget', 'financials': {}, 'deals': [], 'opinions': [], 'source_status': {}}
+        set_cached(key, old, 'entity')
+        entry = cache.get(key)
+        entry['soft_expires'] = time.time() - 1
+        cache.set(key, entry)
+
+        with mock.patch.object(caching, '_get_refresh_executor', return_value=InlineExecutor()):
+            sections = list(scrapers.iter_entity_sections('Widget', 'product'))
+        self.assertEqual(sections[-1], ('done', 'ok', old))
+        self.news.assert_called_once_with('Widget')
+        self.assertEqual(caching.get_cached(key)['deals'][0]['title'], 'Launch')
+
+    def test_concurrent_requests_share_one_scrape(self):
+        release = threading.Event()
+        self.news.side_effect = lambda name: release.wait(5) and [{'title': 'Launch', 'link': 'https://example.com/1'}]
+        leader = scrapers.iter_entity_sections('Widget', 'product')
+        self.assertEqual(next(leader), ('opinions', 'empty', []))
+
+        joined = []
+        follower = threading.Thread(target=lambda: joined.extend(scrapers.iter_entity_sections('Widget', 'product')))
+        follower.start()
+        time.sleep(0.1)
+        release.set()
+        rest = list(leader)
+        follower.join(5)
+
+        self.news.assert_called_once()
+        self.reddit.assert_called_once()
+        self.assertEqual([section for section, _, _ in joined], ['financials', 'deals', 'opinions', 'done'])
+        self.assertEqual(joined[-1], rest[-1])
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SearchEntitiesTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch.object(scrapers, '_search_entities', side_effect=lambda query, deadline: [query])
+    def test_results_are_cached_per_query_as_searched(self, search):
+        self.assertEqual(scrapers.search_entities('aapl'), ['aapl'])
+        # An uppercase query is also a ticker candidate, so it is its own search
+        self.assertEqual(scrapers.search_entities('AAPL'), ['AAPL'])
+        self.assertEqual(scrapers.search_entities('  AAPL '), ['AAPL'])
+        self.assertEqual(search.call_count, 2)
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.dict(metrics._registered, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_workers_add_to_the_same_series(self):
+        metrics.inc('scraper_test_total', host='a')
+        metrics.observe('scraper_test_seconds', 0.3, buckets=(0.1, 0.5), host='a')
+        # Another worker, which hasn't registered the series yet
+        metrics._registered.clear()
+        metrics.inc('scraper_test_total', 2, host='a')
+        metrics.observe('scraper_test_seconds', 2.0, buckets=(0.1, 0.5), host='a')
+
+        lines = metrics.render().splitlines()
+        for line in (
+            '# TYPE scraper_test_total counter',
+            'scraper_test_total{host="a"} 3',
+            'scraper_test_seconds_bucket{host="a",le="0.1"} 0',
+            'scraper_test_seconds_bucket{host="a",le="0.5"} 1',
+            'scraper_test_seconds_bucket{host="a",le="+Inf"} 2',
+            'scraper_test_seconds_sum{host="a"} 2.3',
+            'scraper_test_seconds_count{host="a"} 2',
+        ):
+            self.assertIn(line, lines)
+
+class BenchmarkCommandTests(SimpleTestCase):
+    def run_main(self, *argv):
+        replay, yahoo = mock.Mock(), mock.Mock()
+        with mock.patch.object(benchmarks, '_setup_django'), \
+                mock.patch.dict(benchmarks.BENCHMARKS, {'replay': replay, 'yahoo': yahoo}):
+            benchmarks.main(list(argv))
+        return replay, yahoo
+
+    def test_replay_options(self):
+        replay, yahoo = self.run_main(
+            'replay', '--scenario', 'herd', '--scenario', 'outage',
+            '--latency', '0.2', '--failure-rate', '0.1', '--concurrency', '32',
+        )
+        replay.assert_called_once_with(scenarios=['herd', 'outage'], latency=0.2, failure_rate=0.1, concurrency=32)
+        yahoo.assert_not_called()
+
+    def test_defaults_are_left_to_each_benchmark(self):
+        replay, yahoo = self.run_main('--rounds', '3')
+        replay.assert_called_once_with()
+        yahoo.assert_called_once_with(rounds=3)
+
+    def test_unknown_benchmark(self):
+        with self.assertRaises(SystemExit), mock.patch('sys.stderr'):
+            self.run_main('bogus')
+
+class ParseNumberTests(SimpleTestCase):
+    def test_numbers(self):
+        self.assertEqual(parse_number(5), 5.0)
+        self.assertEqual(parse_number(2.5), 2.5)
+        self.assertEqual(parse_number("1,234.5"), 1234.5)
+        self.assertEqual(parse_number("$12"), 12.0)
+        self.assertEqual(parse_number(" -0.75 "), -0.75)
+
+    def test_suffixes_and_percentages(self):
+        self.assertEqual(parse_number("2.5T"), 2.5e12)
+        self.assertEqual(parse_number("310.4m"), 310.4e6)
+        self.assertEqual(parse_number("12.3%"), 12.3)
+        self.assertEqual(parse_number("(3.5)"), -3.5)
+
+    def test_placeholders(self):
+        for value in (None, True, "", "N/A", "--", "abc"):
+            self.assertIsNone(parse_number(value), value)
+
+    def test_ranges(self):
+        self.assertEqual(parse_range("164.08 - 199.62"), (164.08, 199.62))
+        self.assertEqual(parse_range("N/A - 3"), (None, 3.0))
+        self.assertEqual(parse_range(""), (None, None))
+        self.assertEqual(parse_range(None), (None, None))
+
+    def test_abbreviate(self):
+        self.assertEqual(abbreviate(2534000000000.0), '2.53T')
+        self.assertEqual(abbreviate("310.4M", 1), '310.4M')
+        self.assertEqual(abbreviate(-1500), '-1.50K')
+        self.assertEqual(abbreviate(12), '12.00')
+        self.assertEqual(abbreviate("N/A"), 'N/A')
+
+class ScreeningTests(SimpleTestCase):
+    FINANCIALS = {
+        'AAA': {'pe_ratio': 10, 'price_change_percentage': -6},
+        'BBB': {'pe_ratio': 30, 'price_change_percentage': 2},
+        'CCC': {'pe_ratio': None, 'price_change_percentage': 7},
+        'DDD': {'pe_ratio': 20, 'price_change_percentage': None},
+    }
+
+    def screen(self, *args, **kwargs):
+        with mock.patch.object(screening, 'load_financials', return_value=self.FINANCIALS):
+            return [r['symbol'] for r in screening.screen(list(self.FINANCIALS), *args, **kwargs)]
+
+    def test_operators(self):
+        self.assertEqual(self.screen([('pe_ratio', 'gt', 20)]), ['BBB'])
+        self.assertEqual(self.screen([('pe_ratio', 'gte', 20)]), ['BBB', 'DDD'])
+        self.assertEqual(self.screen([('pe_ratio', 'lt', 20)]), ['AAA'])
+        self.assertEqual(self.screen([('pe_ratio', 'lte', 20)]), ['AAA', 'DDD'])
+        self.assertEqual(self.screen([('price_change_percentage', 'abs_gt', 5)]), ['AAA', 'CCC'])
+        self.assertEqual(self.screen([('price_change_percentage', 'abs_lt', 5)]), ['BBB'])
+
+    def test_missing_values_never_pass_filters(self):
+        self.assertNotIn('CCC', self.screen([('pe_ratio', 'lt', 1000)]))
+        self.assertNotIn('DDD', self.screen([('price_change_percentage', 'gt', -1000)]))
+
+    def test_missing_values_sort_last(self):
+        self.assertEqual(self.screen(sort='pe_ratio'), ['AAA', 'DDD', 'BBB', 'CCC'])
+        self.assertEqual(self.screen(sort='pe_ratio', descending=True), ['BBB', 'DDD', 'AAA', 'CCC'])
+
+    def test_results_report_missing_values_as_none(self):
+        with mock.patch.object(screening, 'load_financials', return_value=self.FINANCIALS):
+            results = screening.screen(['CCC'], fields=['pe_ratio'])
+        self.assertEqual(results, [{'symbol': 'CCC', 'pe_ratio': None}])
+
+    def test_parse_filters(self):
+        self.assertEqual(
+            screening.parse_filters({'pe_ratio__lt': '30', 'market_cap__gte': '2.5T', 'sort': '-pe_ratio'}),
+            [('pe_ratio', 'lt', 30.0), ('market_cap', 'gte', 2.5e12)],
+        )
+        for params in ({'pe__lt': '30'}, {'pe_ratio__below': '30'}, {'pe_ratio__lt': 'cheap'}):
+            with self.assertRaises(ValueError):
+                screening.parse_filters(params)
+
+class ScreenWatchlistViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('screener', password='secret'))
+
+    def test_limit_must_be_positive(self):
+        with mock.patch.object(views, 'screen', return_value=[]) as screen:
+            for limit in ('0', '-3', 'ten'):
+                response = self.client.get(reverse('screen_watchlist'), {'limit': limit})
+                self.assertEqual(response.status_code, 400)
+            screen.assert_not_called()
+
+            response = self.client.get(reverse('screen_watchlist'), {'limit': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(screen.call_args[0][4], 1)
+
+class ParseWatchlistTests(SimpleTestCase):
+    def test_json(self):
+        content = '["AAPL", {"symbol": "MSFT"}, {"name": "Apple"}, "AAPL", " ", 3]'
+        self.assertEqual(watchlist.parse_watchlist(content, 'json'), ['AAPL', 'MSFT', 'Apple'])
+        self.assertEqual(watchlist.parse_watchlist('{"symbols": ["TSLA"]}', 'json'), ['TSLA'])
+        for content in ('"AAPL"', '{"symbols": "AAPL"}', '[AAPL'):
+            with self.assertRaises(ValueError):
+                watchlist.parse_watchlist(content, 'json')
+
+    def test_csv(self):
+        self.assertEqual(watchlist.parse_watchlist("Name,Ticker\nApple,AAPL\n\nMicrosoft,MSFT\n", 'csv'), ['AAPL', 'MSFT'])
+        self.assertEqual(watchlist.parse_watchlist("AAPL,Apple\nMSFT\n", 'csv'), ['AAPL', 'MSFT'])
+        self.assertEqual(watchlist.parse_watchlist("", 'csv'), [])
+
+@override_settings(CACHES=LOCMEM_CACHE, SCRAPER_SYMBOL_INDEX_RELOAD=0)
+class WatchlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('trader', password='secret')
+        self.client.force_login(self.user)
+        CompanySymbol.objects.create(symbol='MSFT', name='Microsoft Corporation', normalized_name='microsoft')
+        patcher = mock.patch.object(watchlist.prefetch_financials, 'delay')
+        self.prefetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def saved_names(self):
+        return sorted(SavedEntity.objects.filter(user=self.user).values_list('entity__name', flat=True))
+
+    def test_import_resolves_entries_and_skips_saved_ones(self):
+        summary = watchlist.import_watchlist(self.user, ['AAPL', 'microsoft', 'Nowhere Co', 'msft'])
+        self.assertEqual(summary, {'added': 2, 'already_saved': 0, 'unresolved': ['Nowhere Co']})
+        self.assertEqual(self.saved_names(), ['AAPL', 'MSFT'])
+        self.prefetch.assert_called_once_with(['AAPL', 'MSFT'])
+
+        summary = watchlist.import_watchlist(self.user, ['AAPL', 'TSLA'])
+        self.assertEqual(summary, {'added': 1, 'already_saved': 1, 'unresolved': []})
+        self.assertEqual(EntityData.objects.filter(name='AAPL').count(), 1)
+
+    def test_remove_only_touches_the_users_entities(self):
+        watchlist.import_watchlist(self.user, ['AAPL', 'MSFT', 'TSLA'])
+        other = User.objects.create_user('other', password='secret')
+        watchlist.import_watchlist(other, ['AAPL'])
+        ids = list(EntityData.objects.filter(name__in=['AAPL', 'MSFT']).values_list('id', flat=True))
+        self.assertEqual(watchlist.remove_from_watchlist(self.user, ids), 2)
+        self.assertEqual(self.saved_names(), ['TSLA'])
+        self.assertEqual(SavedEntity.objects.filter(user=other).count(), 1)
+
+    def test_import_view(self):
+        response = self.client.post(reverse('import_watchlist'), "symbol\nAAPL\nMSFT\n", content_type='text/csv')
+        self.assertEqual(response.json(), {'success': True, 'added': 2, 'already_saved': 0, 'unresolved': []})
+        response = self.client.post(reverse('import_watchlist'), '{"symbols": "AAPL"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('import_watchlist')).status_code, 405)
+
+    def test_export_view(self):
+        watchlist.import_watchlist(self.user, ['AAPL'])
+        rows = self.client.get(reverse('export_watchlist')).content.decode().splitlines()
+        self.assertEqual(rows[0], 'name,type,saved_at')
+        self.assertTrue(rows[1].startswith('AAPL,company,'))
+        response = self.client.get(reverse('export_watchlist'), {'format': 'json'})
+        self.assertEqual([row['name'] for row in response.json()['entities']], ['AAPL'])
+
+    def test_remove_entities_view(self):
+        watchlist.import_watchlist(self.user, ['AAPL', 'MSFT', 'TSLA'])
+        ids = dict(EntityData.objects.values_list('name', 'id'))
+        url = reverse('remove_entities')
+        response = self.client.post(url, json.dumps({'entity_ids': [ids['AAPL'], ids['MSFT']]}), content_type='application/json')
+        self.assertEqual(response.json(), {'success': True, 'removed': 2})
+        response = self.client.post(url, {'entity_ids': [ids['TSLA']]})
+        self.assertEqual(response.json(), {'success': True, 'removed': 1})
+        response = self.client.post(url, {'entity_ids': ['x']})
+        self.assertEqual(response.status_code, 400)
+
+    def test_remove_entities_view_requires_a_list(self):
+        watchlist.import_watchlist(self.user, ['AAPL'])
+        for entity_ids in ('12', {'12': 1}, 12):
+            response = self.client.post(reverse('remove_entities'), json.dumps({'entity_ids': entity_ids}), content_type='application/json')
+            self.assertEqual(response.status_code, 400, entity_ids)
+        self.assertEqual(self.saved_names(), ['AAPL'])
+
+@override_settings(CACHES=LOCMEM_CACHE, SCRAPER_USER_BUDGET=(10, 60))
+class BudgetWindowTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_window_keys(self):
+        with mock.patch.object(budget.time, 'time', return_value=135.0):
+            current, previous, elapsed = budget._window_keys('user:1', 60)
+        self.assertEqual((current, previous), ('budget:user:1:2', 'budget:user:1:1'))
+        self.assertAlmostEqual(elapsed, 0.25)
+
+    def test_previous_window_weighs_by_overlap(self):
+        with mock.patch.object(budget.time, 'time', return_value=90.0):
+            budget.charge('user:1', 8)
+        with mock.patch.object(budget.time, 'time', return_value=135.0):
+            budget.charge('user:1', 3)
+            # 3 now, plus the 75% of the last window still inside the sliding one
+            self.assertAlmostEqual(budget.get_usage('user:1'), 3 + 8 * 0.75)
+            self.assertFalse(budget.is_over_budget('user:1'))
+        with mock.patch.object(budget.time, 'time', return_value=125.0):
+            self.assertTrue(budget.is_over_budget('user:1'))
+
+    @mock.patch.object(budget.time, 'time', return_value=135.0)
+    def test_charge_upstream_counts_calls(self, _):
+        with budget.charge_upstream('addr:1'):
+            self.assertFalse(budget.cache_only())
+            for _ in range(10):
+                budget.record_upstream_call()
+        with budget.charge_upstream('addr:1'):
+            self.assertTrue(budget.cache_only())
+        self.assertEqual(budget.get_usage('addr:1'), 10)
+
+@override_settings(CACHES=LOCMEM_CACHE, SCRAPER_USER_BUDGET=(10, 60))
+class CacheOnlyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        budget.charge('user:1', 10)
+
+    def test_bulk_financials_come_from_cache_and_snapshots(self):
+        set_cached('financial_data_AAPL', {'current_price': 190.0}, 'quote')
+        FinancialSnapshot.objects.create(symbol='MSFT', captured_at=datetime(2024, 1, 2, tzinfo=dt_timezone.utc), price=410.0)
+        with mock.patch.object(scrapers, '_get_fmp_batch') as batch, \
+                mock.patch.object(scrapers, 'get_financial_data') as single, \
+                budget.charge_upstream('user:1'):
+            results = scrapers.get_financial_data_bulk(['AAPL', 'MSFT', 'TSLA'])
+        batch.assert_not_called()
+        single.assert_not_called()
+        self.assertEqual(results['AAPL'], {'current_price': 190.0})
+        self.assertEqual(results['MSFT']['current_price'], 410.0)
+        self.assertNotIn('TSLA', results)
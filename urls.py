@@ -6,4 +6,11 @@ urlpatterns = [
     path('preferences/', views.alert_preferences, name='alert_preferences'),
     path('save-entity/<int:entity_id>/', views.save_entity, name='save_entity'),
     path('remove-entity/<int:entity_id>/', views.remove_entity, name='remove_entity'),
+    path('remove-entities/', views.remove_entities, name='remove_entities'),
+    path('watchlist/import/', views.import_watchlist_view, name='import_watchlist'),
+    path('watchlist/export/', views.export_watchlist_view, name='export_watchlist'),
+    path('watchlist/screen/', views.screen_watchlist, name='screen_watchlist'),
+    path('entity/<str:entity_name>/live/', views.entity_live, name='entity_live'),
+    path('entity/<str:entity_name>/stream/', views.entity_stream, name='entity_stream'),
+    path('metrics/', views.scraper_metrics, name='scraper_metrics'),
 ]
\ No newline at end of file
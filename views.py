@@ -1,21 +1,58 @@
-from django.shortcuts import render, redirect
+import csv
+import json
+import os
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.core.cache import cache
 from core.models import EntityData, SearchHistory
+from core.scrapers import get_financial_data_bulk, iter_entity_sections, looks_like_symbol, revalidate_financials
+from core import budget, metrics
+from core.financials import NUMERIC_FIELDS
+from core.screening import DEFAULT_SCREEN_FIELDS, parse_filters, screen
+from core.fragments import get_fragment_versions
 from alerts.models import Alert
-from .models import UserAlertPrefs
+from .models import UserAlertPrefs, SavedEntity
+from .dashboard_cache import get_dashboard_key, get_dashboard_ttl, invalidate_dashboards
+from .watchlist import export_watchlist, import_watchlist, parse_watchlist, remove_from_watchlist
 
-@login_required
-def dashboard(request):
-    history = SearchHistory.objects.filter(user=request.user).order_by('-search_date')[:10]
-    alerts = Alert.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:10]
-    saved_entities = EntityData.objects.filter(searchhistory__user=request.user).distinct()[:10]  # Simplified for demo
+def build_dashboard_context(user):
+    """Assemble a user's dashboard in a fixed number of queries"""
+    history = list(
+        SearchHistory.objects.filter(user=user).select_related('entity').order_by('-search_date')[:10]
+    )
+    alerts = list(
+        Alert.objects.filter(user=user, is_read=False).select_related('entity').order_by('-created_at')[:10]
+    )
+    saved_entities = [
+        saved.entity for saved in
+        SavedEntity.objects.filter(user=user).select_related('entity').order_by('-created_at')[:10]
+    ]
+    
+    # Attach quotes for saved tickers in one batched lookup
+    symbols = [e.name for e in saved_entities if e.entity_type == 'company' and looks_like_symbol(e.name)]
+    financials = get_financial_data_bulk(symbols) if symbols else {}
+    for entity in saved_entities:
+        entity.financials = financials.get(entity.name, {})
     
-    return render(request, 'dashboard/dashboard.html', {
+    return {
         'history': history,
         'alerts': alerts,
         'saved_entities': saved_entities
-    })
+    }
+
+@login_required
+def dashboard(request):
+    key = get_dashboard_key(request.user.id)
+    context = cache.get(key)
+    if context is None:
+        context = build_dashboard_context(request.user)
+        cache.set(key, context, get_dashboard_ttl())
+    
+    return render(request, 'dashboard/dashboard.html', context)
 
 @login_required
 def alert_preferences(request):
@@ -34,12 +71,25 @@ def alert_preferences(request):
     
     return render(request, 'dashboard/alert_prefs.html', {'prefs': prefs})
 
+def _get_save_cost():
+    """Budget charged per saved entity, which the periodic refresh will scrape"""
+    return getattr(settings, 'SCRAPER_SAVE_COST', 3)
+
+def _over_budget_response():
+    return JsonResponse({'success': False, 'error': 'Request limit reached, please try again later'}, status=429)
+
 @login_required
 def save_entity(request, entity_id):
+    budget_key = budget.get_budget_key(request)
+    if budget.is_over_budget(budget_key):
+        return _over_budget_response()
+    
     try:
         entity = EntityData.objects.get(id=entity_id)
-        # Create a search history entry to "save" the entity
-        SearchHistory.objects.create(user=request.user, entity=entity, notes="Saved entity")
+        _, created = SavedEntity.objects.get_or_create(user=request.user, entity=entity)
+        if created:
+            budget.charge(budget_key, _get_save_cost())
+        invalidate_dashboards([request.user.id])
         return JsonResponse({'success': True})
     except EntityData.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Entity not found'}, status=404)
@@ -47,8 +97,158 @@ def save_entity(request, entity_id):
 @login_required
 def remove_entity(request, entity_id):
     try:
-        # Remove all search history entries for this entity and user
-        SearchHistory.objects.filter(user=request.user, entity_id=entity_id).delete()
+        SavedEntity.objects.filter(user=request.user, entity_id=entity_id).delete()
+        invalidate_dashboards([request.user.id])
         return JsonResponse({'success': True})
     except:
-        return JsonResponse({'success': False, 'error': 'Error removing entity'}, status=500)
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': 'Error removing entity'}, status=500)
+
+@login_required
+def import_watchlist_view(request):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    
+    # An uploaded file, or the request body itself
+    upload = request.FILES.get('file')
+    if upload:
+        content = upload.read().decode('utf-8-sig', errors='replace')
+        default_format = os.path.splitext(upload.name)[1].lstrip('.').lower()
+    else:
+        content = request.body.decode('utf-8-sig', errors='replace')
+        default_format = 'json' if request.content_type == 'application/json' else 'csv'
+    fmt = request.GET.get('format') or default_format
+    
+    try:
+        entries = parse_watchlist(content, fmt)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    budget_key = budget.get_budget_key(request)
+    if budget.is_over_budget(budget_key):
+        return _over_budget_response()
+    
+    summary = import_watchlist(request.user, entries)
+    budget.charge(budget_key, summary['added'] * _get_save_cost())
+    return JsonResponse({'success': True, **summary})
+
+@login_required
+def export_watchlist_view(request):
+    rows = export_watchlist(request.user)
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({'entities': rows})
+        response['Content-Disposition'] = 'attachment; filename="watchlist.json"'
+        return response
+    
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="watchlist.csv"'
+    writer = csv.DictWriter(response, fieldnames=['name', 'type', 'saved_at'])
+    writer.writeheader()
+    writer.writerows(rows)
+    return response
+
+@login_required
+def remove_entities(request):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    
+    try:
+        if request.content_type == 'application/json':
+            entity_ids = json.loads(request.body).get('entity_ids', [])
+            # int() over a string or dict would iterate its characters or keys
+            if not isinstance(entity_ids, list):
+                raise TypeError("entity_ids is not a list")
+        else:
+            entity_ids = request.POST.getlist('entity_ids')
+        entity_ids = [int(i) for i in entity_ids]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'entity_ids must be a list of ids'}, status=400)
+    
+    return JsonResponse({'success': True, 'removed': remove_from_watchlist(request.user, entity_ids)})
+
+# Template rendering each streamed section of the entity results page
+ENTITY_SECTION_TEMPLATES = {
+    'financials': 'core/results_financials.html',
+    'deals': 'core/results_deals.html',
+    'opinions': 'core/results_opinions.html',
+}
+
+def _sse_event(event, html=''):
+    """Format one server-sent event carrying a rendered fragment"""
+    return f"event: {event}\ndata: {json.dumps({'html': html})}\n\n"
+
+@login_required
+def entity_live(request, entity_name):
+    entity = get_object_or_404(EntityData, name=entity_name)
+    return render(request, 'core/results.html', {
+        'entity': entity,
+        'data': {},
+        'stream_url': reverse('entity_stream', kwargs={'entity_name': entity_name})
+    })
+
+@login_required
+def entity_stream(request, entity_name):
+    entity = get_object_or_404(EntityData, name=entity_name)
+    budget_key = budget.get_budget_key(request)
+    
+    def events():
+        # The body runs after the middleware has returned, so it charges
+        # its own upstream calls
+        with budget.charge_upstream(budget_key):
+            sent = set()
+            for section, status, result in iter_entity_sections(entity.name, entity.entity_type):
+                if section == 'done':
+                    # Fill in sections no source produced, e.g. financials for products
+                    for missing in ENTITY_SECTION_TEMPLATES.keys() - sent:
+                        yield _sse_event(missing, render_to_string(ENTITY_SECTION_TEMPLATES[missing], {'entity': entity, 'data': result}))
+                    yield _sse_event('sources', render_to_string('core/results_sources.html', {'data': result}))
+                    yield _sse_event('done')
+                    return
+                
+                sent.add(section)
+                section_data = {section: result or {}}
+                section_data['fragment_versions'] = get_fragment_versions(section_data)
+                context = {'entity': entity, 'data': section_data}
+                yield _sse_event(section, render_to_string(ENTITY_SECTION_TEMPLATES[section], context))
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def screen_watchlist(request):
+    # e.g. ?price_change_percentage__abs_gt=5&sort=-pe_ratio&limit=20
+    try:
+        filters = parse_filters(request.GET)
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    sort = request.GET.get('sort', '')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-') or None
+    fields = [f for f in request.GET.get('fields', '').split(',') if f] or DEFAULT_SCREEN_FIELDS
+    unknown = [f for f in list(fields) + [sort] if f and f not in NUMERIC_FIELDS]
+    if unknown:
+        return JsonResponse({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}, status=400)
+    
+    saved = SavedEntity.objects.filter(user=request.user, entity__entity_type='company').values_list('entity_id', 'entity__name')
+    entity_ids = {name: entity_id for entity_id, name in saved if looks_like_symbol(name)}
+    results = screen(entity_ids, filters, sort, descending, limit, fields, revalidate=revalidate_financials)
+    for result in results:
+        result['entity_id'] = entity_ids[result['symbol']]
+    
+    return JsonResponse({'success': True, 'count': len(results), 'results': results})
+
+def scraper_metrics(request):
+    # Prometheus authenticates with METRICS_TOKEN; people need to be staff
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f"Bearer {token}":
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+    
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
\ No newline at end of file
@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import logging
+from django.conf import settings
+from core.models import EntityData
+from core.scrapers import looks_like_symbol
+from core import symbols
+from .models import SavedEntity
+from .dashboard_cache import invalidate_dashboards
+from .tasks import prefetch_financials
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT/DELETE statement, keeping IN lists under database parameter limits
+WATCHLIST_BATCH_SIZE = 500
+
+# Column headers recognised in imported CSV files, in order of preference
+WATCHLIST_CSV_COLUMNS = ('symbol', 'ticker', 'name', 'entity')
+
+def parse_watchlist(content, fmt):
+    """Read the entries of an uploaded watchlist
+
+    JSON may be a list of strings or of objects with a symbol/name, or an
+    object with a "symbols" list. CSV uses the symbol (or ticker, name,
+    entity) column when there is a header row and the first column
+    otherwise. Raises ValueError for malformed input.
+    """
+    if fmt == 'json':
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get('symbols') or data.get('entities') or []
+        if not isinstance(data, list):
+            raise ValueError("Expected a list of symbols")
+        entries = [item.get('symbol') or item.get('name') if isinstance(item, dict) else item for item in data]
+    else:
+        try:
+            rows = [row for row in csv.reader(io.StringIO(content)) if row]
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV: {str(e)}")
+        header = [cell.strip().lower() for cell in rows[0]] if rows else []
+        column = next((header.index(name) for name in WATCHLIST_CSV_COLUMNS if name in header), None)
+        if column is None:
+            column = 0
+        else:
+            rows = rows[1:]
+        entries = [row[column] for row in rows if len(row) > column]
+
+    return list(dict.fromkeys(e.strip() for e in entries if isinstance(e, str) and e.strip()))
+
+def resolve_symbols(entries):
+    """Resolve watchlist entries to symbols in one pass over the local symbol index
+
+    Entries already written as tickers are kept; company names and
+    lowercase tickers are looked up in the index. Returns
+    ``(symbols, unresolved)``.
+    """
+    resolved, unresolved = [], []
+    for entry in entries:
+        if looks_like_symbol(entry):
+            resolved.append(entry)
+        elif symbols.lookup_name(entry.upper()):
+            resolved.append(entry.upper())
+        else:
+            symbol = symbols.lookup_symbol(entry)
+            if symbol:
+                resolved.append(symbol)
+            else:
+                unresolved.append(entry)
+    return list(dict.fromkeys(resolved)), unresolved
+
+def _get_or_create_entities(names):
+    """Return {name: entity id} for company entities, creating the missing ones in bulk"""
+    existing = {}
+    for i in range(0, len(names), WATCHLIST_BATCH_SIZE):
+        batch = names[i:i + WATCHLIST_BATCH_SIZE]
+        existing.update(
+            EntityData.objects.filter(name__in=batch, entity_type='company').values_list('name', 'id')
+        )
+
+    missing = [name for name in names if name not in existing]
+    if missing:
+        EntityData.objects.bulk_create(
+            [EntityData(name=name, entity_type='company', data={}) for name in missing],
+            batch_size=WATCHLIST_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts leaves primary keys unset, so read them back
+        for i in range(0, len(missing), WATCHLIST_BATCH_SIZE):
+            batch = missing[i:i + WATCHLIST_BATCH_SIZE]
+            existing.update(
+                EntityData.objects.filter(name__in=batch, entity_type='company').values_list('name', 'id')
+            )
+    return existing
+
+def import_watchlist(user, entries):
+    """Save a list of symbols or company names to a user's watchlist in bulk
+
+    Entities and saved rows are written with batched, conflict-ignoring
+    inserts, and one task prefetches financials for the whole imported
+    set. At most WATCHLIST_IMPORT_LIMIT entries are taken. Returns a
+    summary with the number of entities added, those already saved and
+    the entries that couldn't be resolved.
+    """
+    entries = entries[:getattr(settings, 'WATCHLIST_IMPORT_LIMIT', 1000)]
+    resolved, unresolved = resolve_symbols(entries)
+    entity_ids = _get_or_create_entities(resolved)
+
+    already_saved = set(
+        SavedEntity.objects.filter(user=user, entity_id__in=entity_ids.values()).values_list('entity_id', flat=True)
+    )
+    new_rows = [
+        SavedEntity(user=user, entity_id=entity_id)
+        for entity_id in entity_ids.values() if entity_id not in already_saved
+    ]
+    SavedEntity.objects.bulk_create(new_rows, batch_size=WATCHLIST_BATCH_SIZE, ignore_conflicts=True)
+    invalidate_dashboards([user.id])
+
+    if resolved:
+        try:
+            prefetch_financials.delay(resolved)
+        except Exception as e:
+            logger.error(f"Error queueing financials prefetch for {len(resolved)} symbols: {str(e)}")
+
+    return {'added': len(new_rows), 'already_saved': len(already_saved), 'unresolved': unresolved}
+
+def remove_from_watchlist(user, entity_ids):
+    """Remove entities from a user's watchlist in batched deletes, returning how many were removed"""
+    entity_ids = list(entity_ids)
+    removed = 0
+    for i in range(0, len(entity_ids), WATCHLIST_BATCH_SIZE):
+        deleted, _ = SavedEntity.objects.filter(
+            user=user, entity_id__in=entity_ids[i:i + WATCHLIST_BATCH_SIZE]
+        ).delete()
+        removed += deleted
+    invalidate_dashboards([user.id])
+    return removed
+
+def export_watchlist(user):
+    """Return a user's watchlist as dicts with name, type and when it was saved, oldest first"""
+    saved = (
+        SavedEntity.objects.filter(user=user).order_by('created_at')
+        .values_list('entity__name', 'entity__entity_type', 'created_at')
+    )
+    return [
+        {'name': name, 'type': entity_type, 'saved_at': created_at.isoformat()}
+        for name, entity_type, created_at in saved
+    ]